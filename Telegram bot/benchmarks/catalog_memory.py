@@ -0,0 +1,100 @@
+# Memory benchmark for per-user order state.
+#
+# Compares keeping a copy of the catalog slices in every shopper's user_data (the
+# old behaviour) with the shared CatalogIndex snapshot, where platform and
+# category ids travel in callback_data and user_data only holds the selected
+# service id. Run from the "Telegram bot" folder:
+#
+#     python benchmarks/catalog_memory.py --services 3000 --shoppers 0 10 100 500
+import argparse
+import copy
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SOCIAL_MEDIA_PLATFORMS
+from service_catalog import CatalogIndex
+
+
+# Synthetic provider catalog shaped like the SMM v2 `services` response
+def make_services(count, categories_per_platform=12):
+    keywords = list(SOCIAL_MEDIA_PLATFORMS.values())
+    services = []
+    for service_id in range(1, count + 1):
+        keyword = keywords[service_id % len(keywords)]
+        category = f"{keyword} category {service_id % categories_per_platform}"
+        services.append({
+            "service": service_id,
+            "name": f"{keyword} service {service_id} - high quality, no drop",
+            "type": "Default",
+            "category": category,
+            "rate": f"{random.uniform(0.1, 50):.4f}",
+            "min": "10",
+            "max": "100000",
+            "refill": service_id % 2 == 0,
+            "cancel": False,
+        })
+    return services
+
+
+# What each shopper used to carry around: the platform/category lists of the catalog.
+# A deep copy models user_data after a round trip through PTB persistence.
+def legacy_user_data(catalog):
+    platforms = [
+        (platform.label, [list(category.services) for category in platform.categories.values()])
+        for platform in catalog.platforms.values()
+    ]
+    return {"platforms": copy.deepcopy(platforms)}
+
+
+def cursor_user_data(catalog):
+    service = random.choice(catalog.services)
+    return {"selected_service_id": str(service["service"])}
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(make_user_data, catalog, shoppers):
+    gc.collect()
+    tracemalloc.start()
+    rss_before = rss_kb()
+    user_data = {user_id: make_user_data(catalog) for user_id in range(shoppers)}
+    traced, _ = tracemalloc.get_traced_memory()
+    rss_after = rss_kb()
+    tracemalloc.stop()
+    del user_data
+    gc.collect()
+    return traced // 1024, max(rss_after - rss_before, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user order state memory benchmark.")
+    parser.add_argument("--services", type=int, default=3000)
+    parser.add_argument("--shoppers", type=int, nargs="+", default=[0, 10, 100, 500])
+    args = parser.parse_args()
+
+    random.seed(0)
+    catalog = CatalogIndex(make_services(args.services), version=1, category_ids={})
+    print(f"Catalog: {args.services} services, {len(catalog.categories)} categories")
+    print(f"{'shoppers':>9} | {'legacy traced KB':>16} {'RSS KB':>9} | {'cursor traced KB':>16} {'RSS KB':>9}")
+
+    for shoppers in args.shoppers:
+        legacy = measure(legacy_user_data, catalog, shoppers)
+        cursor = measure(cursor_user_data, catalog, shoppers)
+        print(f"{shoppers:>9} | {legacy[0]:>16} {legacy[1]:>9} | {cursor[0]:>16} {cursor[1]:>9}")
+
+
+if __name__ == "__main__":
+    main()
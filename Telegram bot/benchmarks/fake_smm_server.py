@@ -0,0 +1,201 @@
+# Local stand-in for an SMM panel v2 API (services, add, status, multi-status and
+# balance) for load, latency and chaos tests without touching the live provider.
+#
+#     python benchmarks/fake_smm_server.py --port 8080 --latency 0.2 --error-rate 0.05
+#     SMM_API_URL=http://127.0.0.1:8080/api/v2 python main.py
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SOCIAL_MEDIA_PLATFORMS
+
+SERVICE_KINDS = ["Followers", "Likes", "Views", "Comments", "Shares", "Members", "Reactions", "Story Views"]
+SERVICE_QUALITIES = ["Real", "High Quality", "Instant", "No Drop", "Refill 30 Days", "Cheap"]
+
+
+# Catalog, orders and balance of the fake panel; shared by every request thread
+class FakePanel:
+    def __init__(self, service_count, completion_time, cancel_rate, balance, seed=None):
+        self.random = random.Random(seed)
+        self.completion_time = completion_time
+        self.cancel_rate = cancel_rate
+        self.balance = balance
+        self.services = self.make_services(service_count)
+        self.services_by_id = {service["service"]: service for service in self.services}
+        self.orders = {}
+        self.next_order_id = 100000
+        self.lock = threading.Lock()
+
+    # A catalog spread over the bot's platforms, with several categories each
+    def make_services(self, count):
+        keywords = list(SOCIAL_MEDIA_PLATFORMS.values())
+        services = []
+        for service_id in range(1, count + 1):
+            keyword = self.random.choice(keywords)
+            kind = self.random.choice(SERVICE_KINDS)
+            quality = self.random.choice(SERVICE_QUALITIES)
+            minimum = self.random.choice([10, 50, 100, 500])
+            services.append({
+                "service": service_id,
+                "name": f"{keyword} {kind} [{quality}] #{service_id}",
+                "type": "Default",
+                "category": f"{keyword} | {kind}",
+                "rate": f"{self.random.uniform(500, 200000):.2f}",
+                "min": str(minimum),
+                "max": str(minimum * self.random.choice([100, 1000, 10000])),
+                "refill": self.random.random() < 0.5,
+                "cancel": self.random.random() < 0.2,
+            })
+        return services
+
+    def add(self, params):
+        try:
+            service = self.services_by_id[int(params["service"])]
+            quantity = int(params["quantity"])
+        except (KeyError, ValueError):
+            return {"error": "Incorrect service ID"}
+        if not params.get("link"):
+            return {"error": "Incorrect link"}
+        if not int(service["min"]) <= quantity <= int(service["max"]):
+            return {"error": "Incorrect quantity"}
+
+        charge = float(service["rate"]) * quantity / 1000
+        with self.lock:
+            if charge > self.balance:
+                return {"error": "Not enough funds on balance"}
+            self.balance -= charge
+            self.next_order_id += 1
+            order_id = self.next_order_id
+            self.orders[order_id] = {
+                "created": time.monotonic(),
+                "quantity": quantity,
+                "charge": charge,
+                "start_count": self.random.randint(0, 5000),
+                "canceled": self.random.random() < self.cancel_rate,
+            }
+        return {"order": order_id}
+
+    # Orders stay Pending for the first 10% of completion_time, then deliver
+    # linearly while In Progress; canceled orders stop halfway through
+    def order_status(self, order_id):
+        try:
+            order = self.orders.get(int(order_id))
+        except ValueError:
+            order = None
+        if order is None:
+            return {"error": "Incorrect order ID"}
+
+        progress = (time.monotonic() - order["created"]) / self.completion_time
+        if order["canceled"] and progress >= 0.5:
+            status, remains = "Canceled", order["quantity"]
+        elif progress < 0.1:
+            status, remains = "Pending", order["quantity"]
+        elif progress < 1:
+            status, remains = "In Progress", round(order["quantity"] * (1 - (progress - 0.1) / 0.9))
+        else:
+            status, remains = "Completed", 0
+        return {
+            "charge": f"{order['charge']:.5f}",
+            "start_count": str(order["start_count"]),
+            "status": status,
+            "remains": str(remains),
+            "currency": "IRT",
+        }
+
+    def handle(self, params):
+        action = params.get("action")
+        if not params.get("key"):
+            return {"error": "Incorrect request"}
+        if action == "services":
+            return self.services
+        if action == "add":
+            return self.add(params)
+        if action == "status" and "orders" in params:
+            return {
+                order_id: self.order_status(order_id)
+                for order_id in params["orders"].split(",")
+                if order_id
+            }
+        if action == "status":
+            return self.order_status(params.get("order", ""))
+        if action == "balance":
+            with self.lock:
+                return {"balance": f"{self.balance:.5f}", "currency": "IRT"}
+        return {"error": "Incorrect request"}
+
+
+def make_handler(panel, latency, jitter, error_rate, hang_rate):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.respond(parse_qs(urlparse(self.path).query))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.respond(parse_qs(self.rfile.read(length).decode("utf-8")))
+
+        def respond(self, query):
+            params = {key: values[-1] for key, values in query.items()}
+            time.sleep(max(0.0, random.gauss(latency, jitter)))
+
+            roll = random.random()
+            if roll < hang_rate:
+                # Longer than any client timeout
+                time.sleep(120)
+            if roll < hang_rate + error_rate:
+                self.send(503, {"error": "Service temporarily unavailable"})
+            else:
+                self.send(200, panel.handle(params))
+
+        def send(self, status_code, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake SMM panel v2 API for local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--services", type=int, default=3000, help="catalog size")
+    parser.add_argument("--latency", type=float, default=0.15, help="mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="response delay std deviation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests that hang")
+    parser.add_argument("--completion-time", type=float, default=300, help="seconds until an order completes")
+    parser.add_argument("--cancel-rate", type=float, default=0.05, help="share of orders that get canceled")
+    parser.add_argument("--balance", type=float, default=1e12)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    panel = FakePanel(args.services, args.completion_time, args.cancel_rate, args.balance, args.seed)
+    handler = make_handler(panel, args.latency, args.jitter, args.error_rate, args.hang_rate)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"Fake SMM panel with {args.services} services on http://{args.host}:{args.port}/api/v2")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
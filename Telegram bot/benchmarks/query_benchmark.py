@@ -0,0 +1,163 @@
+# Query benchmark for the lookup indexes added by migrations.py.
+#
+# Builds an unindexed database shaped like telegram_bot.db before the migrations
+# (1M users and 10M orders by default), times the bot's hot lookups, applies the
+# migrations and times them again. Run from the "Telegram bot" folder:
+#
+#     python benchmarks/query_benchmark.py --users 1000000 --orders 10000000
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from migrations import run_migrations
+
+# Tables as create_all made them before any migration
+SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, num_id INTEGER, "
+    "preferred_language VARCHAR, is_admin BOOLEAN, remaining_credit INTEGER)",
+    "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, order_id INTEGER NOT NULL UNIQUE, "
+    "service_id VARCHAR, link VARCHAR, quantity INTEGER, status VARCHAR, timestamp DATETIME)",
+    "CREATE TABLE tickets (id INTEGER PRIMARY KEY, user_id INTEGER, title VARCHAR, "
+    "description VARCHAR, status VARCHAR)",
+    "CREATE TABLE agency_requests (id INTEGER PRIMARY KEY, user_id INTEGER, "
+    "daily_sales VARCHAR, status VARCHAR)",
+]
+
+# Order i is placed i seconds after this
+ORDERS_START = datetime(2024, 1, 1)
+
+# name -> (sql, function returning random parameters)
+QUERIES = {
+    "user by num_id": (
+        "SELECT id, preferred_language, is_admin FROM users WHERE num_id = ?",
+        lambda args: (random.randint(1, args.users) * 7,),
+    ),
+    "order history page": (
+        "SELECT order_id, status FROM orders WHERE user_id = ? "
+        "ORDER BY timestamp DESC, id DESC LIMIT 11",
+        lambda args: (random.randint(1, args.users),),
+    ),
+    "order history next page": (
+        "SELECT order_id, status FROM orders WHERE user_id = ? AND (timestamp, id) < (?, ?) "
+        "ORDER BY timestamp DESC, id DESC LIMIT 11",
+        lambda args: random_order_cursor(args),
+    ),
+    "open tickets": (
+        "SELECT id, title FROM tickets WHERE status = 'open' LIMIT 10",
+        lambda args: (),
+    ),
+    "pending agency requests": (
+        "SELECT id, daily_sales FROM agency_requests WHERE status = 'pending' LIMIT 10",
+        lambda args: (),
+    ),
+}
+
+
+# (user_id, timestamp, id) of a page cursor somewhere in a random user's history
+def random_order_cursor(args):
+    order_id = random.randint(1, args.orders)
+    timestamp = (ORDERS_START + timedelta(seconds=order_id)).isoformat(" ")
+    return random.randint(1, args.users), timestamp, order_id
+
+
+def batched(rows, size=100000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def populate(path, args):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    for statement in SCHEMA:
+        db.execute(statement)
+
+    languages = ["en", "fa", "ar"]
+    users = ((i, f"user{i}", i * 7, random.choice(languages), i % 1000 == 0, 100) for i in range(1, args.users + 1))
+    for batch in batched(users):
+        db.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)", batch)
+
+    statuses = ["Completed"] * 8 + ["Canceled", "In Progress"]
+    orders = (
+        (
+            i,
+            random.randint(1, args.users),
+            i,
+            "1",
+            "https://instagram.com/p/x",
+            1000,
+            random.choice(statuses),
+            (ORDERS_START + timedelta(seconds=i)).isoformat(" "),
+        )
+        for i in range(1, args.orders + 1)
+    )
+    for batch in batched(orders):
+        db.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+
+    # Most tickets and requests are handled; the few open ones are what admins page through
+    tickets = ((i, random.randint(1, args.users), "t", "d", "open" if i % 500 == 0 else "closed") for i in range(1, args.users // 10 + 1))
+    for batch in batched(tickets):
+        db.executemany("INSERT INTO tickets VALUES (?, ?, ?, ?, ?)", batch)
+    requests = ((i, random.randint(1, args.users), "100", "pending" if i % 500 == 0 else "approved") for i in range(1, args.users // 100 + 1))
+    for batch in batched(requests):
+        db.executemany("INSERT INTO agency_requests VALUES (?, ?, ?, ?)", batch)
+    db.commit()
+    db.close()
+
+
+def time_queries(path, args):
+    db = sqlite3.connect(path)
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            db.execute(sql, params(args)).fetchall()
+        results[name] = (time.perf_counter() - started) / args.repeat * 1000
+    db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lookup query benchmark before and after migrations.")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--orders", type=int, default=10000000)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    parser.add_argument("--path", help="database file (default: a temporary file)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    path = args.path or os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    started = time.perf_counter()
+    populate(path, args)
+    print(f"Built {args.users:,} users / {args.orders:,} orders in {time.perf_counter() - started:.1f}s")
+
+    before = time_queries(path, args)
+    started = time.perf_counter()
+    with create_engine(f"sqlite:///{path}").connect() as connection:
+        run_migrations(connection)
+    print(f"Migrations took {time.perf_counter() - started:.1f}s")
+    after = time_queries(path, args)
+
+    print(f"{'query':<26} {'before ms':>12} {'after ms':>10} {'speedup':>9}")
+    for name in QUERIES:
+        print(f"{name:<26} {before[name]:>12.3f} {after[name]:>10.3f} {before[name] / max(after[name], 1e-6):>8.0f}x")
+    if not args.path:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import ast
+import json
+import os
+
+from config import languages
+from message_catalog import LOCALES_DIR, TEMPLATE_FILE
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FILES = [os.path.join(BOT_DIR, "main.py"), os.path.join(BOT_DIR, "keyboards.py")]
+
+# Calls whose first argument is a user-facing string that goes through translation
+TRANSLATION_CALLS = {"translate", "translate_many", "translate_template", "N_"}
+
+# Language the msgids are written in; its bundle is built without the translator
+SOURCE_LANGUAGE = "en"
+
+
+# Collect the string literals reachable from a translation call argument
+def literal_strings(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, ast.JoinedStr):
+        if all(isinstance(value, ast.Constant) for value in node.values):
+            return ["".join(value.value for value in node.values)]
+        return []
+    if isinstance(node, ast.IfExp):
+        return literal_strings(node.body) + literal_strings(node.orelse)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        return literal_strings(node.left) + literal_strings(node.right)
+    if isinstance(node, (ast.List, ast.Tuple)):
+        strings = []
+        for element in node.elts:
+            strings.extend(literal_strings(element))
+        return strings
+    return []
+
+
+def call_name(node):
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+# Extract every literal msgid passed to a translation call in the bot's modules
+def extract_messages(paths=SOURCE_FILES):
+    msgids = []
+    seen = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+
+        calls = [
+            node
+            for node in ast.walk(tree)
+            if isinstance(node, ast.Call) and call_name(node) in TRANSLATION_CALLS and node.args
+        ]
+        calls.sort(key=lambda node: (node.lineno, node.col_offset))
+
+        for node in calls:
+            for msgid in literal_strings(node.args[0]):
+                if msgid.strip() and msgid not in seen:
+                    seen.add(msgid)
+                    msgids.append(msgid)
+    return msgids
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def load_bundle(path):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+# Pretranslate the msgids missing from a language bundle, dropping stale entries
+def build_bundle(msgids, language):
+    from translation import machine_translate_template
+
+    path = os.path.join(LOCALES_DIR, f"{language}.json")
+    existing = load_bundle(path)
+    bundle = {}
+    for msgid in msgids:
+        if msgid in existing:
+            bundle[msgid] = existing[msgid]
+        elif language == SOURCE_LANGUAGE:
+            bundle[msgid] = msgid
+        else:
+            bundle[msgid] = machine_translate_template(msgid, language)
+            print(f"[{language}] {msgid[:60]!r}")
+    write_json(path, bundle)
+    return bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract translatable strings from the bot and pretranslate them."
+    )
+    parser.add_argument(
+        "--extract-only",
+        action="store_true",
+        help="only refresh locales/messages.json and the source language bundle, don't call the translator",
+    )
+    parser.add_argument(
+        "--language",
+        action="append",
+        help="language code to build (default: every language in config.languages)",
+    )
+    args = parser.parse_args()
+
+    os.makedirs(LOCALES_DIR, exist_ok=True)
+    msgids = extract_messages()
+    write_json(os.path.join(LOCALES_DIR, TEMPLATE_FILE), msgids)
+    print(f"Extracted {len(msgids)} messages")
+
+    if args.extract_only:
+        bundle = build_bundle(msgids, SOURCE_LANGUAGE)
+        print(f"Built {SOURCE_LANGUAGE}.json with {len(bundle)} messages")
+        return
+
+    for language in args.language or languages.values():
+        bundle = build_bundle(msgids, language)
+        print(f"Built {language}.json with {len(bundle)} messages")
+
+
+if __name__ == "__main__":
+    main()
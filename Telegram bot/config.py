@@ -1,8 +1,11 @@
+import os
+
 TOKEN = "7120665237:AAHfUL5xgyEsZe9af1mdSr4FwiLoVl1vcP8"
 NOTIFICATION_CHANNEL_ID = -1002147674595
 REPRESENTATIVES = -1002247297668
 ORDER_CHANNEL_ID = -1002207597572
-API_URL = "https://followeriha.com/api/v2"
+# Set SMM_API_URL to point the bot at another panel, e.g. benchmarks/fake_smm_server.py
+API_URL = os.environ.get("SMM_API_URL", "https://followeriha.com/api/v2")
 API_KEY = "5fa6f085fb10db47fec23f3f74eb4c97"
 admin_usernames = ["Canyildiz1386", "followergir_support"]
 
@@ -18,3 +21,83 @@ SOCIAL_MEDIA_PLATFORMS = {
 }
 languages = {"🇬🇧 English": "en", "🇮🇷 فارسی": "fa", "🇸🇦 العربية": "ar"}
 
+
+# Translation cache: SQLite file for persisted translations and in-memory LRU size
+TRANSLATION_CACHE_PATH = "translation_cache.db"
+TRANSLATION_CACHE_SIZE = 5000
+
+# Translation executor: thread pool size and per-call timeout in seconds
+TRANSLATION_WORKERS = 4
+TRANSLATION_TIMEOUT = 3
+
+# Provider service catalog: cache lifetime and background refresh interval in seconds
+SERVICE_CATALOG_TTL = 900
+SERVICE_CATALOG_REFRESH_INTERVAL = 600
+
+# SMM provider HTTP client: pooled keep-alive connections, in-flight request
+# limit and per-action timeouts in seconds
+PROVIDER_MAX_CONNECTIONS = 20
+PROVIDER_CONCURRENCY = 10
+PROVIDER_TIMEOUTS = {"services": 30, "add": 15, "status": 10, "balance": 10}
+PROVIDER_DEFAULT_TIMEOUT = 10
+# Retries for idempotent actions, with jittered exponential backoff from this base delay
+PROVIDER_RETRIES = 2
+PROVIDER_RETRY_BACKOFF = 0.5
+# Circuit breaker: consecutive failures before failing fast, and seconds before a retry
+PROVIDER_BREAKER_THRESHOLD = 5
+PROVIDER_BREAKER_RESET_TIMEOUT = 30
+# Order ids per bulk `status` request
+PROVIDER_BULK_STATUS_SIZE = 100
+# Single-order status cache: lifetime in seconds and maximum number of entries
+ORDER_STATUS_CACHE_TTL = 30
+ORDER_STATUS_CACHE_SIZE = 10000
+# Telegram id -> (language, admin flag, user id) profile cache: lifetime in
+# seconds and maximum number of entries
+USER_PROFILE_CACHE_TTL = 600
+USER_PROFILE_CACHE_SIZE = 50000
+
+# Background order-status poller: job interval, and how often an open order is
+# polled by age as (max age in seconds, interval in seconds); older orders use
+# ORDER_POLL_MAX_INTERVAL. Each run polls at most ORDER_POLL_BATCH_SIZE orders,
+# the longest overdue first; the rest stay due for the next run.
+ORDER_POLL_INTERVAL = 60
+ORDER_POLL_BACKOFF = [(3600, 60), (6 * 3600, 300), (24 * 3600, 900)]
+ORDER_POLL_MAX_INTERVAL = 3600
+ORDER_POLL_BATCH_SIZE = 500
+
+# Order placement queue: number of worker tasks sending queued orders to the provider
+ORDER_QUEUE_WORKERS = 4
+
+# Seconds before a checkout the provider never received (circuit breaker open,
+# connection refused) is sent again
+ORDER_RETRY_DELAY = 30
+
+# Mass orders: most lines accepted in one message and provider calls in flight at once
+MASS_ORDER_MAX_LINES = 50
+MASS_ORDER_CONCURRENCY = 5
+
+# Orders listed per page of the order history
+ORDERS_PAGE_SIZE = 10
+
+# Agency requests and tickets listed per page of the admin views
+ADMIN_PAGE_SIZE = 10
+
+# Toman per dollar used until an admin sets a conversion rate
+DEFAULT_DOLLAR_TO_TOMAN_RATE = 60000
+
+# Main database: async driver URL, SQLAlchemy connection pool and the SQLite tuning applied to
+# every new connection (WAL lets readers run alongside the writer)
+DATABASE_URL = "sqlite+aiosqlite:///telegram_bot.db"
+DATABASE_POOL_SIZE = 5
+DATABASE_MAX_OVERFLOW = 10
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative: size in KiB
+    "busy_timeout": 5000,  # milliseconds
+    "temp_store": "MEMORY",
+}
+# Seconds between WAL checkpoints and the checkpoint mode
+SQLITE_CHECKPOINT_INTERVAL = 300
+SQLITE_CHECKPOINT_MODE = "TRUNCATE"
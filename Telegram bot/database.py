@@ -0,0 +1,63 @@
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from config import (
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_SIZE,
+    DATABASE_URL,
+    SQLITE_CHECKPOINT_MODE,
+    SQLITE_PRAGMAS,
+)
+from migrations import run_migrations
+from models import Base
+
+
+# Apply the SQLite tuning profile to each new pooled connection
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def create_database_engine(url=DATABASE_URL):
+    engine = create_async_engine(
+        url,
+        pool_size=DATABASE_POOL_SIZE,
+        max_overflow=DATABASE_MAX_OVERFLOW,
+    )
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+    return engine
+
+
+engine = create_database_engine()
+# Objects stay loaded after commit: an expired attribute can't lazy-load outside
+# an await, and handlers keep using the user they loaded after committing
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+# Create missing tables, then apply the versioned migrations in migrations.py for
+# changes to existing ones
+async def init_database():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with engine.connect() as connection:
+        await connection.run_sync(run_migrations)
+
+
+# Copy the WAL back into the database file; returns (busy, wal frames, checkpointed frames)
+async def checkpoint(mode=SQLITE_CHECKPOINT_MODE):
+    async with engine.connect() as connection:
+        result = await connection.execute(text(f"PRAGMA wal_checkpoint({mode})"))
+        return tuple(result.one())
+
+
+# JobQueue callback that checkpoints the WAL so it stays small
+async def checkpoint_database(context):
+    try:
+        busy, wal_frames, checkpointed = await checkpoint()
+    except Exception as e:
+        print(f"WAL checkpoint failed: {e}")
+        return
+    if busy:
+        print(f"WAL checkpoint incomplete: {checkpointed}/{wal_frames} frames copied")
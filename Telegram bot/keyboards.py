@@ -0,0 +1,172 @@
+import asyncio
+from collections import namedtuple
+from types import MappingProxyType
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config import languages, TRANSLATION_TIMEOUT
+from message_catalog import message_catalog
+from translation import N_, translate_many_checked
+
+# A prebuilt screen: translated message text and its keyboard
+Screen = namedtuple("Screen", ["text", "reply_markup"])
+
+# One keyboard button; labels with translatable=False are shown as-is
+Button = namedtuple("Button", ["label", "callback_data", "translatable"], defaults=[True])
+
+
+# Main menu for admins and regular users
+def main_menu_layout(language, is_admin):
+    text = N_(
+        "🎉 Welcome to the bot! 🎊\n\n"
+        "We are thrilled to have you here! 🌟\n"
+        "You can now enjoy all the features of our bot 🚀.\n"
+        "If you need any help, feel free to ask! 🛠️\n\n"
+        "Enjoy your experience! 😊"
+    )
+    referral_label = N_("🔗 Subcategory Link" if language == "en" else "🔗 لینک زیر مجموعه گیری")
+
+    # Admin-specific menu items
+    if is_admin:
+        return text, [
+            Button(N_("➕ Add Order"), "add_order"),
+            Button(N_("🔍 View Order"), "view_order"),
+            Button(N_("ℹ️ Account Information"), "account_info"),
+            Button(N_("📊 View Agency Requests"), "view_agency_requests"),
+            Button(N_("🎟️ View Tickets"), "view_tickets"),
+            Button(N_("⚙️ Settings"), "settings"),
+            Button(N_("🎯 Chance Circle"), "chance_circle"),
+            Button(referral_label, "referral_link"),
+            Button(N_("💳 Increase Credit"), "increment_credit"),
+            Button(N_("💲 Manage Unit Value"), "manage_unit_value"),
+            Button(N_("📢 Broadcast Message" if language == "en" else "📢 اطلاع رسانی پیام"), "broadcast_message"),
+            Button(N_("💲 Manage Conversion Rate"), "manage_conversion_rate"),
+        ]
+
+    # Regular user-specific menu items
+    return text, [
+        Button(N_("➕ Add Order"), "add_order"),
+        Button(N_("🔍 View Order"), "view_order"),
+        Button(N_("ℹ️ Account Information"), "account_info"),
+        Button(N_("🏢 Representation Request"), "request_agency"),
+        Button(N_("⚙️ Settings"), "settings"),
+        Button(N_("🎯 Chance Circle"), "chance_circle"),
+        Button(N_("🎫 Send ticket" if language == "en" else "🎫 ارسال تیکت"), "create_ticket"),
+        Button(referral_label, "referral_link"),
+        Button(N_("💳 Increase Credit"), "increment_credit"),
+    ]
+
+
+# Language picker in the settings menu
+def settings_layout(language, is_admin):
+    buttons = [Button(name, name, translatable=False) for name in languages.keys()]
+    buttons.append(Button(N_("🔙 Back"), "back"))
+    return N_("🌍 Please choose your language 🗣️:"), buttons
+
+
+def manage_order_layout(language, is_admin):
+    return N_("🛒 Manage Order 🛠️"), [
+        Button(N_("➕ Add Order"), "add_order"),
+        Button(N_("🔍 View Order"), "view_order"),
+        Button(N_("🔍 Enter Custom Order ID"), "custom_order_id"),
+        Button(N_("🔙 Back"), "back"),
+    ]
+
+
+def admin_management_layout(language, is_admin):
+    return N_("🔧 Admin Management ⚙️"), [
+        Button(N_("➕ Add Admin"), "add_admin"),
+        Button(N_("➖ Delete Admin"), "delete_admin"),
+        Button(N_("🔙 Back"), "back"),
+    ]
+
+
+def manage_off_codes_layout(language, is_admin):
+    return N_("🔧 Manage Off Codes 🛠️"), [
+        Button(N_("➕ Add Off Code"), "add_off_code"),
+        Button(N_("📋 View Off Codes"), "view_off_codes"),
+        Button(N_("➖ Delete Off Code"), "delete_off_code"),
+        Button(N_("🔙 Back"), "back"),
+    ]
+
+
+def broadcast_message_layout(language, is_admin):
+    return N_("📢 Broadcast Message" if language == "en" else "📢 اطلاع رسانی پیام"), [
+        Button(N_("👥 Users"), "broadcast_users"),
+        Button(N_("👤 Admins"), "broadcast_admins"),
+        Button(N_("🔙 Back"), "back"),
+    ]
+
+
+SCREEN_LAYOUTS = {
+    "main_menu": main_menu_layout,
+    "settings": settings_layout,
+    "manage_order": manage_order_layout,
+    "admin_management": admin_management_layout,
+    "manage_off_codes": manage_off_codes_layout,
+    "broadcast_message": broadcast_message_layout,
+}
+
+
+# Translate a layout in one batch and turn it into a Screen; returns (screen,
+# complete) where complete is False if any string fell back to its source text
+async def build_screen(name, language, is_admin, timeout=TRANSLATION_TIMEOUT):
+    text, buttons = SCREEN_LAYOUTS[name](language, is_admin)
+    translatable = [button.label for button in buttons if button.translatable]
+    (translated_text, *labels), complete = await translate_many_checked(
+        [text] + translatable, language, timeout=timeout
+    )
+
+    labels = iter(labels)
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                next(labels) if button.translatable else button.label,
+                callback_data=button.callback_data,
+            )
+        ]
+        for button in buttons
+    ]
+    return Screen(translated_text, InlineKeyboardMarkup(keyboard)), complete
+
+
+# Immutable registry of prebuilt screens for every language in config.languages and
+# each role. Only fully translated screens are kept: one that fell back to source
+# text because the translator was slow is served once and built again on next use.
+# A catalog reload drops every screen; they are rebuilt one at a time as needed.
+class KeyboardRegistry:
+    def __init__(self):
+        self.catalog_version = None
+        self._screens = MappingProxyType({})
+
+    async def build(self):
+        catalog_version = message_catalog.version
+        keys = [
+            (name, language, is_admin)
+            for name in SCREEN_LAYOUTS
+            for language in [None, *languages.values()]
+            for is_admin in (False, True)
+        ]
+        built = await asyncio.gather(*(build_screen(*key) for key in keys))
+        self._screens = MappingProxyType(
+            {key: screen for key, (screen, complete) in zip(keys, built) if complete}
+        )
+        self.catalog_version = catalog_version
+
+    # Prebuilt screen for a language and role, building it on demand (bounded by
+    # TRANSLATION_TIMEOUT) if it isn't there yet
+    async def get(self, name, language, is_admin=False):
+        if self.catalog_version != message_catalog.version:
+            self._screens = MappingProxyType({})
+            self.catalog_version = message_catalog.version
+
+        key = (name, language, bool(is_admin))
+        screen = self._screens.get(key)
+        if screen is None:
+            screen, complete = await build_screen(*key)
+            # Languages outside config.languages are built every time, not stored
+            if complete and (language is None or language in languages.values()):
+                self._screens = MappingProxyType({**self._screens, key: screen})
+        return screen
+
+
+keyboard_registry = KeyboardRegistry()
@@ -1,7 +1,7 @@
 import random
 import asyncio
 import math
-import requests
+import uuid
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ApplicationBuilder,
@@ -11,119 +11,95 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-from deep_translator import GoogleTranslator
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone, timedelta
 from config import (
     TOKEN,
+    SERVICE_CATALOG_REFRESH_INTERVAL,
+    ORDER_POLL_BATCH_SIZE,
+    ORDER_POLL_INTERVAL,
+    ORDER_POLL_BACKOFF,
+    ORDER_POLL_MAX_INTERVAL,
     NOTIFICATION_CHANNEL_ID,
-    API_KEY,
-    API_URL,
+    ORDER_CHANNEL_ID,
+    ORDER_QUEUE_WORKERS,
+    ORDER_RETRY_DELAY,
+    DEFAULT_DOLLAR_TO_TOMAN_RATE,
+    SQLITE_CHECKPOINT_INTERVAL,
+    MASS_ORDER_MAX_LINES,
+    MASS_ORDER_CONCURRENCY,
+    ORDERS_PAGE_SIZE,
+    ADMIN_PAGE_SIZE,
     admin_usernames,
-    SOCIAL_MEDIA_PLATFORMS,
     REPRESENTATIVES,
     languages
 )
+from keyboards import keyboard_registry
+from message_catalog import message_catalog
+from service_catalog import service_catalog, refresh_service_catalog, ServiceCatalogUnavailable
+from price_table import price_table, order_cost, max_orderable_quantity
+from settings_store import settings_store, DEFAULT_UNIT
+from smm_provider import (
+    provider,
+    order_status_cache,
+    OrderStatus,
+    ProviderError,
+    ProviderNotReached,
+    ProviderRejected,
+    ProviderUnavailable,
+)
+from database import engine, Session, init_database, checkpoint_database
+from models import FINAL_ORDER_STATUSES, AgencyRequest, ConversionRate, DiscountCode, Order, QueuedOrder, Ticket, Unit, User
+from repository import (
+    add_user_credit,
+    count_open_orders,
+    get_admin_summary,
+    get_agency_request_with_user,
+    get_conversion_rate,
+    get_discount_code,
+    get_discount_codes,
+    get_due_orders,
+    get_open_tickets_page,
+    get_order,
+    get_pending_agency_requests_page,
+    get_queued_order,
+    get_ticket_with_user,
+    get_unconfirmed_queued_orders,
+    get_unfinished_queued_orders,
+    get_unit,
+    get_units,
+    get_user,
+    get_user_by_id,
+    get_user_orders_page,
+    get_users,
+    get_users_by_ids,
+    get_waiting_queued_orders,
+    idempotency_keys_exist,
+    refund_user_credit,
+    charge_user_credit,
+)
+from unit_of_work import install_unit_of_work, current_admin, current_user
+from user_profiles import profile_of, user_profile_cache
+from translation import (
+    translate,
+    translate_many,
+    translate_template,
+    translation_cache,
+)
 
-# Setting up SQLAlchemy ORM base class
-Base = declarative_base()
-
-
-# User model for storing user details
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True)
-    username = Column(String)
-    first_name = Column(String)
-    last_name = Column(Integer)
-    num_id = Column(Integer)
-    profile_url = Column(String)
-    preferred_language = Column(String)
-    is_premium = Column(Boolean)
-    is_bot = Column(Boolean)
-    is_admin = Column(Boolean, default=False)
-    join_date = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    used_credit = Column(Integer, default=0)
-    remaining_credit = Column(Integer, default=1)
-    referral_credit = Column(Integer, default=0)
-    sub_transaction_earnings = Column(Integer, default=0)
-    last_chance_time = Column(DateTime, default=lambda: datetime.now(timezone.utc) - timedelta(days=1))
-    last_ticket_time = Column(DateTime, default=lambda: datetime.now(timezone.utc) - timedelta(minutes=10))
-    referrer_id = Column(Integer, nullable=True)
-
-
-# AgencyRequest model for handling agency requests
-class AgencyRequest(Base):
-    __tablename__ = "agency_requests"
-    id = Column(Integer, primary_key=True)
-    user_id = Column(Integer)
-    daily_sales = Column(String)
-    status = Column(String, default="pending")
-
-
-# Ticket model for storing support tickets
-class Ticket(Base):
-    __tablename__ = "tickets"
-    id = Column(Integer, primary_key=True)
-    user_id = Column(Integer)
-    title = Column(String)
-    description = Column(String)
-    status = Column(String, default="open")
-
-
-# DiscountCode model for storing discount codes
-class DiscountCode(Base):
-    __tablename__ = "discount_codes"
-    id = Column(Integer, primary_key=True)
-    code = Column(String, unique=True, nullable=False)
-    discount_percent = Column(Integer, nullable=False)
-
-
-# ConversionRate model for storing conversion rates
-class ConversionRate(Base):
-    __tablename__ = "conversion_rate"
-    id = Column(Integer, primary_key=True)
-    rate = Column(Integer, nullable=False, default=60000)
-
-
-# Unit model for storing unit values
-class Unit(Base):
-    __tablename__ = "units"
-    id = Column(Integer, primary_key=True)
-    name = Column(String, unique=True, nullable=False)
-    value = Column(Integer, nullable=False)  # Default value set to 1
-
-
-# Order model for storing orders
-class Order(Base):
-    __tablename__ = "orders"
-    id = Column(Integer, primary_key=True)
-    user_id = Column(Integer)
-    order_id = Column(Integer, unique=True, nullable=False)
-    service_id = Column(String)
-    link = Column(String)
-    quantity = Column(Integer)
-    status = Column(String, default="Pending")
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-
-
-# Database setup
-engine = create_engine("sqlite:///telegram_bot.db")
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-
-
-# Helper function to translate text based on user's preferred language
-def translate_text(text, target_language):
-    if target_language:
-        return GoogleTranslator(source="auto", target=target_language).translate(text)
-    return text
+# Emoji shown next to each provider order status
+ORDER_STATUS_EMOJIS = {
+    "Pending": "🟡",
+    "In Progress": "🔵",
+    "Completed": "🟢",
+    "Partial": "🟠",
+    "Canceled": "🔴",
+}
 
 
 # The start command handler, responsible for initiating the bot
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    session = Session()
+    session = context.session
     referrer_id = None
 
     if context.args:
@@ -132,8 +108,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except ValueError:
             pass
 
-    # Fetch user details from the database
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
     if not user:
         is_admin = update.effective_user.username in admin_usernames
@@ -150,20 +125,23 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             referrer_id=referrer_id,
         )
         session.add(new_user)
-        session.commit()
+        # Flush so the column defaults are set before the referral bonus below
+        await session.flush()
+        context.user_row = new_user
+        context.profile = profile_of(new_user)
 
         # Handle referral logic
         if referrer_id:
-            referrer = session.query(User).filter_by(num_id=referrer_id).first()
+            referrer = await get_user(session, referrer_id)
             if referrer:
-                referrer.remaining_credit += 10
-                new_user.remaining_credit += 10
-                session.commit()
+                await add_user_credit(session, referrer, 10)
+                await add_user_credit(session, new_user, 10)
                 await context.bot.send_message(
                     chat_id=referrer.num_id,
-                    text=translate_text(
-                        f"🎉 Your referral has been successful! You and {new_user.username} have both received 10 credits. 🤑",
+                    text=await translate_template(
+                        "🎉 Your referral has been successful! You and {username} have both received 10 credits. 🤑",
                         referrer.preferred_language,
+                        username=new_user.username,
                     ),
                 )
         
@@ -186,8 +164,6 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         await check_channel_membership(update, context)
 
-    session.close()
-
 
 # Function to prompt user for language selection
 async def prompt_language_selection(
@@ -210,14 +186,14 @@ async def prompt_language_selection(
 # Handle language selection and save the user's choice
 async def handle_language_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = await current_user(context)
     selected_language = query.data
 
     if selected_language in languages:
         user.preferred_language = languages[selected_language]
-        session.commit()
-        translated_message = translate_text(
+        # The cache is written through on commit; the rest of this update sees it now
+        context.profile = profile_of(user)
+        translated_message = await translate(
             "✅ Language set successfully! 🌟 Translating messages... 🌍",
             user.preferred_language,
         )
@@ -225,120 +201,12 @@ async def handle_language_selection(update: Update, context: ContextTypes.DEFAUL
         await query.edit_message_text(translated_message)
         await check_channel_membership(update, context)
 
-    session.close()
-
 
 # Show the main menu after a user has selected their language and joined the channel
 async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, user):
-    session = Session()
-
-    if not session.is_active:
-        session.begin()
-
-    user = session.merge(user)
-
-    # Translate menu items based on user preference
-    settings_button = translate_text("⚙️ Settings", user.preferred_language)
-    chance_circle_button = translate_text("🎯 Chance Circle", user.preferred_language)
-    ticket_button = translate_text(f'🎫 {"Send ticket" if user.preferred_language == "en" else "ارسال تیکت"}', user.preferred_language)
-    referral_link_button = translate_text(f"🔗 {'Subcategory Link' if user.preferred_language == 'en' else 'لینک زیر مجموعه گیری' }", user.preferred_language)
-    increment_credit_button = translate_text(
-        "💳 Increase Credit", user.preferred_language
-    )
-    manage_conversion_rate_button = translate_text(
-        "💲 Manage Conversion Rate", user.preferred_language
-    )
-
-    add_order_button = translate_text("➕ Add Order", user.preferred_language)
-    view_order_button = translate_text("🔍 View Order", user.preferred_language)
-
-    # Admin-specific menu items
-    if user.is_admin:
-        account_info_button = translate_text(
-            "ℹ️ Account Information", user.preferred_language
-        )
-        view_agencies_button = translate_text(
-            "📊 View Agency Requests", user.preferred_language
-        )
-        view_tickets_button = translate_text("🎟️ View Tickets", user.preferred_language)
-
-
-        manage_unit_value_button = translate_text(
-            "💲 Manage Unit Value", user.preferred_language
-        )
-        broadcast_button = translate_text(
-            "📢 Broadcast Message" if user.preferred_language == "en" else "📢 اطلاع رسانی پیام", user.preferred_language
-        )
-        keyboard = [
-            [InlineKeyboardButton(add_order_button, callback_data="add_order")],
-            [InlineKeyboardButton(view_order_button, callback_data="view_order")],
-            [InlineKeyboardButton(account_info_button, callback_data="account_info")],
-            [
-                InlineKeyboardButton(
-                    view_agencies_button, callback_data="view_agency_requests"
-                )
-            ],
-            [InlineKeyboardButton(view_tickets_button, callback_data="view_tickets")],
-            [InlineKeyboardButton(settings_button, callback_data="settings")],
-            [InlineKeyboardButton(chance_circle_button, callback_data="chance_circle")],
-            [InlineKeyboardButton(referral_link_button, callback_data="referral_link")],
-            [
-                InlineKeyboardButton(
-                    increment_credit_button, callback_data="increment_credit"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    manage_unit_value_button, callback_data="manage_unit_value"
-                )
-            ],
-            [InlineKeyboardButton(broadcast_button, callback_data="broadcast_message")],
-        ]
-        keyboard.append(
-            [
-                InlineKeyboardButton(
-                    manage_conversion_rate_button,
-                    callback_data="manage_conversion_rate",
-                )
-            ]
-        )
-
-    # Regular user-specific menu items
-    else:
-        account_info_button = translate_text(
-            "ℹ️ Account Information", user.preferred_language
-        )
-        request_agency_button = translate_text(
-            "🏢 Representation Request", user.preferred_language
-        )
-        keyboard = [
-            [InlineKeyboardButton(add_order_button, callback_data="add_order")],
-            [InlineKeyboardButton(view_order_button, callback_data="view_order")],
-            [InlineKeyboardButton(account_info_button, callback_data="account_info")],
-            [
-                InlineKeyboardButton(
-                    request_agency_button, callback_data="request_agency"
-                )
-            ],
-            [InlineKeyboardButton(settings_button, callback_data="settings")],
-            [InlineKeyboardButton(chance_circle_button, callback_data="chance_circle")],
-            [InlineKeyboardButton(ticket_button, callback_data="create_ticket")],
-            [InlineKeyboardButton(referral_link_button, callback_data="referral_link")],
-            [
-                InlineKeyboardButton(
-                    increment_credit_button, callback_data="increment_credit"
-                )
-            ],
-        ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    welcome_message = translate_text(
-        "🎉 Welcome to the bot! 🎊\n\n"
-        "We are thrilled to have you here! 🌟\n"
-        "You can now enjoy all the features of our bot 🚀.\n"
-        "If you need any help, feel free to ask! 🛠️\n\n"
-        "Enjoy your experience! 😊",
-        user.preferred_language,
+    # Prebuilt menu for the user's language and role
+    welcome_message, reply_markup = await keyboard_registry.get(
+        "main_menu", user.preferred_language, user.is_admin
     )
 
     if update.callback_query:
@@ -348,8 +216,6 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, use
     elif update.message:
         await update.message.reply_text(welcome_message, reply_markup=reply_markup)
 
-    session.close()  # Close the session here
-
 
 # Safely edit a message without causing Telegram errors
 async def safe_edit_message_text(
@@ -368,8 +234,7 @@ async def safe_edit_message_text(
 
 # Check if the user has joined the required channel
 async def check_channel_membership(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
     try:
         member = await context.bot.get_chat_member(
@@ -383,14 +248,12 @@ async def check_channel_membership(update: Update, context: ContextTypes.DEFAULT
     except Exception:
         await prompt_user_to_join(update, context, user.preferred_language)
 
-    session.close()
-
 
 # Prompt the user to join the required channel
 async def prompt_user_to_join(
     update: Update, context: ContextTypes.DEFAULT_TYPE, language
 ):
-    join_message = translate_text(
+    join_message = await translate(
         "🔗 Please join our channel @sultanpanel to continue 😊", language
     )
     keyboard = [
@@ -417,28 +280,17 @@ async def prompt_user_to_join(
 # Handle the settings menu where users can change their preferences
 async def handle_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
-    keyboard = [
-        [InlineKeyboardButton(lang, callback_data=lang)] for lang in languages.keys()
-    ]
-    back_button = translate_text("🔙 Back", user.preferred_language)
-    keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    settings_message = translate_text(
-        "🌍 Please choose your language 🗣️:", user.preferred_language
+    text, reply_markup = await keyboard_registry.get(
+        "settings", user.preferred_language, user.is_admin
     )
-
-    await query.edit_message_text(settings_message, reply_markup=reply_markup)
-
-    session.close()
+    await query.edit_message_text(text, reply_markup=reply_markup)
 
 
 # Handle the "Chance Circle" feature, where users can win extra credits daily
 async def handle_chance_circle(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = await current_user(context)
     now = datetime.now(timezone.utc)
 
     if user.last_chance_time.tzinfo is None:
@@ -447,12 +299,12 @@ async def handle_chance_circle(update: Update, context: ContextTypes.DEFAULT_TYP
     if now - user.last_chance_time >= timedelta(days=1):
         user.last_chance_time = now
         credit_reward = random.randint(10, 100)
-        user.remaining_credit += credit_reward
-        session.commit()
+        await add_user_credit(context.session, user, credit_reward)
 
-        reward_message = translate_text(
-            f"🎉 Congratulations! You've received {credit_reward} units of credit! 💵",
+        reward_message = await translate_template(
+            "🎉 Congratulations! You've received {credit_reward} units of credit! 💵",
             user.preferred_language,
+            credit_reward=credit_reward,
         )
         await update.callback_query.edit_message_text(reward_message)
         await show_main_menu(update, context, user)
@@ -461,35 +313,31 @@ async def handle_chance_circle(update: Update, context: ContextTypes.DEFAULT_TYP
         wait_hours = wait_time.total_seconds() // 3600
         wait_minutes = (wait_time.total_seconds() % 3600) // 60
 
-        wait_message = translate_text(
-            f"⏳ You can use the Chance Circle again in {int(wait_hours)} hours and {int(wait_minutes)} minutes. 🕒",
+        wait_message = await translate_template(
+            "⏳ You can use the Chance Circle again in {wait_hours} hours and {wait_minutes} minutes. 🕒",
             user.preferred_language,
+            wait_hours=int(wait_hours),
+            wait_minutes=int(wait_minutes),
         )
         await update.callback_query.edit_message_text(wait_message)
         await show_main_menu(update, context, user)
 
-    session.close()
-
 
-import requests
-
-
-# Fetch the current conversion rate from the database
-async def get_dollar_to_toman_rate():
+# Load the conversion rate and every named unit into the settings store
+async def load_settings():
     session = Session()
-    rate_entry = session.query(ConversionRate).first()
+    rate_entry = await get_conversion_rate(session)
     if rate_entry:
         rate = rate_entry.rate
     else:
-        # If no rate is set, use the default value
-        rate = 60000
-        # Save the default rate to the database
-        new_rate = ConversionRate(rate=rate)
-        session.add(new_rate)
-        session.commit()
+        # If no rate is set, save the default value to the database
+        rate = DEFAULT_DOLLAR_TO_TOMAN_RATE
+        session.add(ConversionRate(rate=rate))
+        await session.commit()
 
-    session.close()
-    return rate
+    units = {unit.name: unit.value for unit in await get_units(session)}
+    await session.close()
+    settings_store.load(rate, units)
 
 
 # Handle the conversion rate management for admins
@@ -497,12 +345,11 @@ async def handle_manage_conversion_rate(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
     if user.is_admin:
         await query.edit_message_text(
-            translate_text(
+            await translate(
                 "💲 Please enter the new conversion rate (Toman per Dollar):",
                 user.preferred_language,
             )
@@ -510,31 +357,27 @@ async def handle_manage_conversion_rate(
         context.user_data["awaiting_conversion_rate"] = True
     else:
         await query.edit_message_text(
-            translate_text(
+            await translate(
                 "❌ You do not have permission to perform this action.",
                 user.preferred_language,
             )
         )
 
-    session.close()
-
 
 # Display the user's account information, including credits and earnings
 async def handle_account_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = await current_user(context)
 
     if user.join_date.tzinfo is None:
         user.join_date = user.join_date.replace(tzinfo=timezone.utc)
 
     membership_duration = (datetime.now(timezone.utc) - user.join_date).days
-    dollar_to_toman_rate = await get_dollar_to_toman_rate()
+    dollar_to_toman_rate = settings_store.dollar_to_toman_rate
 
     # Convert credits to dollars and tomans
     credit_dollars = user.remaining_credit / 100
     credit_toman = credit_dollars * dollar_to_toman_rate
-    credit_info = f"{credit_dollars:.2f}$ ({int(credit_toman):,} Toman)"
 
     # Convert referral credits to dollars and tomans
     referral_dollars = user.referral_credit / 100
@@ -551,76 +394,101 @@ async def handle_account_info(update: Update, context: ContextTypes.DEFAULT_TYPE
     # Convert used credits to dollars and tomans
     used_credit_dollars = user.used_credit / 100
     used_credit_toman = used_credit_dollars * dollar_to_toman_rate
-    used_credit_info = f'{used_credit_dollars:.2f}$ ({int(used_credit_toman):,} {"Toman" if user.preferred_language == "en" else "تومان"})'
 
     # Form the account information text
-    account_info_text = (
-        f"ℹ️ Account Information:\n\n"
-        f"📅 Membership Duration: {membership_duration} days 📅\n"
-        f"💳 Used Credit: {used_credit_info}\n"  # Updated line
-        f"💰 Remaining Credit: {credit_info}\n"
-     )
-
-    account_info_text = translate_text(account_info_text, user.preferred_language)
-    back_button = translate_text("🔙 Back to Main Menu", user.preferred_language)
+    account_info_text = await translate_template(
+        "ℹ️ Account Information:\n\n"
+        "📅 Membership Duration: {membership_duration} days 📅\n"
+        "💳 Used Credit: {used_credit_dollars:.2f}$ ({used_credit_toman:,} Toman)\n"
+        "💰 Remaining Credit: {credit_dollars:.2f}$ ({credit_toman:,} Toman)\n",
+        user.preferred_language,
+        membership_duration=membership_duration,
+        used_credit_dollars=used_credit_dollars,
+        used_credit_toman=int(used_credit_toman),
+        credit_dollars=credit_dollars,
+        credit_toman=int(credit_toman),
+    )
+    back_button = await translate("🔙 Back to Main Menu", user.preferred_language)
     keyboard = [[InlineKeyboardButton(back_button, callback_data="back")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text(account_info_text +    f'\n🎁 {"Credit from Subcategory:" if user.preferred_language == "en" else "سود حاصل از زیرمجموعه گیری:"} {referral_info}\n'
         f'💵 {"Credit from Subcategories charge:" if user.preferred_language == "en" else "سود حاصل از شارژ زیرمجموعه ها:"} {sub_transaction_info}'
     , reply_markup=reply_markup)
-    session.close()
 
 
 # Handle the agency request process for users
 async def handle_request_agency(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    user = context.profile
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
-    request_text = translate_text(
+    request_text = await translate(
         "💼 Please enter your daily sales (e.g., 200 dollars or 200 rials): 💼",
         user.preferred_language,
     )
     await query.message.edit_text(request_text)
 
     context.user_data["awaiting_sales_input"] = True
-    session.close()
 
 
-# Admin function to view pending agency requests
+# Cursor of an admin list callback such as "view_tickets_after_42", as keyword
+# arguments for the page queries; empty for the first page
+def parse_id_cursor(data):
+    parts = data.rsplit("_", 2)
+    if len(parts) == 3 and parts[1] in ("after", "before") and parts[2].isdigit():
+        return {parts[1]: int(parts[2])}
+    return {}
+
+
+# "⬅️ Back" / "➡️ Next" buttons for a page of an admin list keyed on ids
+def id_page_buttons(prefix, cursor, first_id, last_id, more):
+    has_previous = "after" in cursor or ("before" in cursor and more)
+    has_next = "before" in cursor or ("before" not in cursor and more)
+    buttons = []
+    if has_previous:
+        buttons.append(
+            InlineKeyboardButton("⬅️ Back", callback_data=f"{prefix}_before_{first_id}")
+        )
+    if has_next:
+        buttons.append(
+            InlineKeyboardButton("➡️ Next", callback_data=f"{prefix}_after_{last_id}")
+        )
+    return buttons
+
+
+# Admin function to view pending agency requests, a page at a time
 async def handle_view_agency_requests(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ):
     query = update.callback_query
-    session = Session()
-
-    admin = (
-        session.query(User)
-        .filter_by(num_id=update.effective_user.id, is_admin=True)
-        .first()
-    )
+    session = context.session
+    admin = current_admin(context)
     if admin:
-        pending_requests = (
-            session.query(AgencyRequest).filter_by(status="pending").all()
+        cursor = parse_id_cursor(query.data)
+        # Each row comes with its user from the same query
+        rows, more = await get_pending_agency_requests_page(
+            session, ADMIN_PAGE_SIZE, **cursor
         )
 
-        if pending_requests:
+        if rows:
+            summary = await get_admin_summary(session)
             keyboard = []
-            message_text = translate_text(
-                "📋 *Requests:*\n\n", admin.preferred_language
+            message_text = await translate_template(
+                "📋 *Requests ({count} pending):*\n\n",
+                admin.preferred_language,
+                count=summary.pending_agency_requests,
             )
 
-            for request in pending_requests:
-                user = session.query(User).filter_by(id=request.user_id).first()
+            for request, user in rows:
+                label = f"💼 {request.daily_sales}"
+                if user and user.username:
+                    label += f" · @{user.username}"
                 keyboard.append(
                     [
-                        InlineKeyboardButton(
-                            f"💼 {request.daily_sales}", callback_data="noop"
-                        ),
+                        InlineKeyboardButton(label, callback_data="noop"),
                         InlineKeyboardButton(
                             "✅", callback_data=f"approve_{request.id}"
                         ),
@@ -630,23 +498,29 @@ async def handle_view_agency_requests(
                     ]
                 )
 
+            page_buttons = id_page_buttons(
+                "view_agency_requests", cursor, rows[0][0].id, rows[-1][0].id, more
+            )
+            if page_buttons:
+                keyboard.append(page_buttons)
+            back_button = await translate("🔙 Back", admin.preferred_language)
+            keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
             reply_markup = InlineKeyboardMarkup(keyboard)
             await query.message.edit_text(
                 text=message_text, reply_markup=reply_markup, parse_mode="Markdown"
             )
         else:
-            back_button = translate_text("🔙 Back", admin.preferred_language)
+            back_button = await translate("🔙 Back", admin.preferred_language)
             keyboard = [[InlineKeyboardButton(back_button, callback_data="back")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
 
             await query.edit_message_text(
-                translate_text(
+                await translate(
                     "❌ There are no pending agency requests. ❌",
                     admin.preferred_language,
                 ),
                 reply_markup=reply_markup,
             )
-    session.close()
 
 
 # Handle the action of approving or rejecting an agency request
@@ -654,21 +528,19 @@ async def handle_agency_request_action(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ):
     query = update.callback_query
-    session = Session()
+    session = context.session
 
     action, request_id = query.data.split("_")
-    request = session.query(AgencyRequest).filter_by(id=request_id).first()
+    request, user = await get_agency_request_with_user(session, request_id)
 
     if request:
-        user = session.query(User).filter_by(id=request.user_id).first()
-        back_button = translate_text("🔙 Back", user.preferred_language)
+        back_button = await translate("🔙 Back", user.preferred_language)
         keyboard = []
         keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
         reply_markup = InlineKeyboardMarkup(keyboard)
 
         if action == "approve":
             request.status = "approved"
-            session.commit()
             await context.bot.send_message(
                 chat_id=REPRESENTATIVES,  # Replace with your actual notification channel ID or chat ID
                 text=(
@@ -683,20 +555,17 @@ async def handle_agency_request_action(
             await context.bot.send_message(chat_id=REPRESENTATIVES, text=user)
         elif action == "reject":
             request.status = "rejected"
-            session.commit()
             await context.bot.send_message(
                 chat_id=user.num_id,
-                text=translate_text(
+                text=await translate(
                     "❌ Your agency request has been rejected. ❌",
                     user.preferred_language,
                 ),
             )
 
-        session.delete(request)
-        session.commit()
+        await session.delete(request)
 
         await handle_view_agency_requests(update, context)
-    session.close()
 
 
 # Handle the "back" action, typically returning to the main menu
@@ -730,8 +599,7 @@ async def safe_edit_message_text(
 # Updated function to handle back action properly in the referral link section
 async def handle_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
     try:
         # Check if the callback query message exists and if it can be edited
@@ -742,14 +610,14 @@ async def handle_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 # If the message is not text, send a new message
                 await context.bot.send_message(
                     chat_id=query.message.chat_id,
-                    text=translate_text("Returning to the main menu...", user.preferred_language)
+                    text=await translate("Returning to the main menu...", user.preferred_language)
                 )
                 await show_main_menu(update, context, user)
         else:
             # Fallback: Send a new message if editing the message isn't possible
             await context.bot.send_message(
                 chat_id=query.message.chat_id,
-                text=translate_text("Returning to the main menu...", user.preferred_language)
+                text=await translate("Returning to the main menu...", user.preferred_language)
             )
             await show_main_menu(update, context, user)
     except Exception as e:
@@ -759,23 +627,20 @@ async def handle_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         print(f"Failed to handle back action: {e}")
 
-    session.close()
-
 
 # Handle the creation of support tickets
 async def handle_create_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = await current_user(context)
 
-    can_send_ticket, message = check_ticket_time(user)
+    can_send_ticket, message = await check_ticket_time(user)
 
     if can_send_ticket:
-        back_button = translate_text("🔙 Back", user.preferred_language)
+        back_button = await translate("🔙 Back", user.preferred_language)
         keyboard = []
         keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.callback_query.edit_message_text(
-            translate_text(
+            await translate(
                 "🎫 Please enter the title of your ticket: 📝", user.preferred_language
             ),
             reply_markup=reply_markup,
@@ -786,24 +651,22 @@ async def handle_create_ticket(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.callback_query.edit_message_text(message)
         await show_main_menu(update, context, user)
 
-    session.close()
 
 
 
-# Admin function to view open support tickets
+# Admin function to view open support tickets, a page at a time
 async def handle_view_tickets(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-
-    admin = (
-        session.query(User)
-        .filter_by(num_id=update.effective_user.id, is_admin=True)
-        .first()
-    )
+    session = context.session
+    admin = current_admin(context)
     if admin:
-        open_tickets = session.query(Ticket).filter_by(status="open").all()
+        cursor = parse_id_cursor(query.data)
+        open_tickets, more = await get_open_tickets_page(
+            session, ADMIN_PAGE_SIZE, **cursor
+        )
 
         if open_tickets:
+            summary = await get_admin_summary(session)
             keyboard = [
                 [
                     InlineKeyboardButton(
@@ -812,27 +675,35 @@ async def handle_view_tickets(update: Update, context: ContextTypes.DEFAULT_TYPE
                 ]
                 for ticket in open_tickets
             ]
-            back_button = translate_text("🔙 Back", admin.preferred_language)
+            page_buttons = id_page_buttons(
+                "view_tickets", cursor, open_tickets[0].id, open_tickets[-1].id, more
+            )
+            if page_buttons:
+                keyboard.append(page_buttons)
+            back_button = await translate("🔙 Back", admin.preferred_language)
             keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
             reply_markup = InlineKeyboardMarkup(keyboard)
             await query.edit_message_text(
-                translate_text("🎟️ Open Tickets: 🎟️", admin.preferred_language),
+                await translate_template(
+                    "🎟️ Open Tickets ({count}): 🎟️",
+                    admin.preferred_language,
+                    count=summary.open_tickets,
+                ),
                 reply_markup=reply_markup,
             )
         else:
-            back_button = translate_text("🔙 Back", admin.preferred_language)
+            back_button = await translate("🔙 Back", admin.preferred_language)
             keyboard = [[InlineKeyboardButton(back_button, callback_data="back")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
 
             await query.edit_message_text(
-                translate_text(
+                await translate(
                     "❌ There are no open tickets. ❌", admin.preferred_language
                 ),
                 reply_markup=reply_markup,
             )
 
-    session.close()
-def check_ticket_time(user):
+async def check_ticket_time(user):
     current_time = datetime.now(timezone.utc)
 
     if user.last_ticket_time.tzinfo is None:
@@ -843,23 +714,23 @@ def check_ticket_time(user):
     if time_since_last_ticket < timedelta(minutes=10):
         remaining_time = timedelta(minutes=10) - time_since_last_ticket
         minutes, seconds = divmod(remaining_time.seconds, 60)
-        message = f"⏳ زمان تخمینی باقیمانده : {minutes} دقیقه و {seconds} ثانیه"
-        return False, translate_text(message, user.preferred_language)
+        return False, await translate_template(
+            "⏳ زمان تخمینی باقیمانده : {minutes} دقیقه و {seconds} ثانیه",
+            user.preferred_language,
+            minutes=minutes,
+            seconds=seconds,
+        )
     else:
-        message = "✍️ می‌توانید یک پیام جدید ارسال کنید"
-        return True, translate_text(message, user.preferred_language)
+        return True, await translate(
+            "✍️ می‌توانید یک پیام جدید ارسال کنید", user.preferred_language
+        )
 
 
 # Handle viewing the details of an individual ticket
 async def handle_view_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-
-    admin = (
-        session.query(User)
-        .filter_by(num_id=update.effective_user.id, is_admin=True)
-        .first()
-    )
+    session = context.session
+    admin = current_admin(context)
 
     if admin:
         print(admin)
@@ -872,26 +743,27 @@ async def handle_view_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return
         print(ticket_id,action)
         ticket_id = ticket_id.split("_")[1]
-        ticket = session.query(Ticket).filter_by(id=ticket_id).first()
+        ticket, user = await get_ticket_with_user(session, ticket_id)
         print(ticket)
         if ticket:
-            user = session.query(User).filter_by(id=ticket.user_id).first()
             context.user_data["responding_ticket_id"] = ticket.id
             context.user_data["awaiting_ticket_response"] = True
 
-            # Prepare the ticket details message
-            ticket_details = (
-                f"👤 **User Details:**\n"
-                f"• Username: @{user.username if user.username else 'N/A'}\n"
-                f"• Numeric ID: {user.num_id}\n\n"
-                f"🎟️ **Ticket Details:**\n"
-                f"• Subject: {ticket.title}\n"
-                f"• Description: {ticket.description}\n\n"
-                f"📩 **Reply to this ticket:**"
+            # Prepare the translated ticket details message
+            translated_ticket_details = await translate_template(
+                "👤 **User Details:**\n"
+                "• Username: @{username}\n"
+                "• Numeric ID: {num_id}\n\n"
+                "🎟️ **Ticket Details:**\n"
+                "• Subject: {title}\n"
+                "• Description: {description}\n\n"
+                "📩 **Reply to this ticket:**",
+                admin.preferred_language,
+                username=user.username if user.username else "N/A",
+                num_id=str(user.num_id),
+                title=ticket.title,
+                description=ticket.description,
             )
-
-            # Translate the message
-            translated_ticket_details = translate_text(ticket_details, admin.preferred_language)
             
             # Add a button to reply to the ticket
             keyboard = [[InlineKeyboardButton("📝 Reply", callback_data="reply_ticket")]]
@@ -903,28 +775,20 @@ async def handle_view_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 parse_mode="Markdown",
             )
 
-    session.close()
 
 # Handle ticket response from admin
 async def handle_ticket_response(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-
-    admin = (
-        session.query(User)
-        .filter_by(num_id=update.effective_user.id, is_admin=True)
-        .first()
-    )
+    session = context.session
+    admin = current_admin(context)
 
     if admin and "responding_ticket_id" in context.user_data:
         ticket_id = context.user_data["responding_ticket_id"]
-        ticket = session.query(Ticket).filter_by(id=ticket_id).first()
+        ticket, user = await get_ticket_with_user(session, ticket_id)
 
         if ticket:
-            user = session.query(User).filter_by(id=ticket.user_id).first()
-
             # Ask the admin for the response message
-            ask_response_message = translate_text(
+            ask_response_message = await translate(
                 "📝 Please enter your reply to the user:", user.preferred_language
             )
             await query.edit_message_text(ask_response_message)
@@ -932,20 +796,18 @@ async def handle_ticket_response(update: Update, context: ContextTypes.DEFAULT_T
             context.user_data["awaiting_ticket_response_text"] = True
         else:
             await query.edit_message_text(
-                translate_text(
+                await translate(
                     "⚠️ Ticket not found, please try again.", admin.preferred_language
                 )
             )
 
-    session.close()
-
 
 # General message handler to process various user inputs based on context
 async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    session = context.session
+    user = await current_user(context)
     broadcast_to = context.user_data.get("broadcast_to")
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -959,7 +821,7 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
             await add_credit_to_user(update, context, user)
             context.user_data["awaiting_payment"] = False
             await update.message.reply_text(
-                translate_text(
+                await translate(
                     "🎉 Payment confirmed! Your credits have been added successfully. 🎊",
                     user.preferred_language
                 ),
@@ -967,7 +829,7 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
             )
         else:
             await update.message.reply_text(
-                translate_text(
+                await translate(
                     "❌ Payment confirmation failed. Please check the transaction ID and try again. ❌",
                     user.preferred_language
                 ),
@@ -976,7 +838,7 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     if context.user_data.get("awaiting_conversion_rate"):
         try:
             new_rate = int(update.message.text.strip())
-            rate_entry = session.query(ConversionRate).first()
+            rate_entry = await get_conversion_rate(session)
 
             if rate_entry:
                 rate_entry.rate = new_rate
@@ -984,16 +846,18 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
                 new_rate_entry = ConversionRate(rate=new_rate)
                 session.add(new_rate_entry)
 
-            session.commit()
+            await session.commit()
+            settings_store.set_dollar_to_toman_rate(new_rate)
 
-            success_message = translate_text(
-                f"✅ Conversion rate updated to {new_rate} Toman per Dollar.",
+            success_message = await translate_template(
+                "✅ Conversion rate updated to {new_rate} Toman per Dollar.",
                 user.preferred_language,
+                new_rate=new_rate,
             )
             await update.message.reply_text(success_message, reply_markup=reply_markup)
         except ValueError:
             await update.message.reply_text(
-                translate_text(
+                await translate(
                     "❌ Invalid rate. Please enter a valid number.",
                     user.preferred_language,
                 ),
@@ -1006,11 +870,11 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     if context.user_data.get("awaiting_custom_increment"):
         try:
             custom_amount = float(update.message.text.strip())
-            unit = session.query(Unit).filter_by(name="default").first()
+            unit_value_cents = settings_store.unit_value()
 
-            if not unit:
+            if not unit_value_cents:
                 await update.message.reply_text(
-                    translate_text(
+                    await translate(
                         "❌ Unit value is not set. Please contact an admin. ❌",
                         user.preferred_language,
                     ),
@@ -1018,23 +882,24 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
                 )
                 return
 
-            unit_value_cents = unit.value
-            dollar_to_toman_rate = await get_dollar_to_toman_rate()
+            dollar_to_toman_rate = settings_store.dollar_to_toman_rate
             credit_amount_units = custom_amount * (100 / unit_value_cents)  # Convert dollars to units
             credit_amount_toman = custom_amount * dollar_to_toman_rate
 
-            user.remaining_credit += credit_amount_units * 100
-            session.commit()
+            await add_user_credit(session, user, credit_amount_units * 100)
 
-            success_message = translate_text(
-                f"✅ {credit_amount_units:.2f} units have been added to your account!\n"
-                f"💵 Equivalent to {custom_amount:.2f} dollars and {int(credit_amount_toman):,} Toman.",
+            success_message = await translate_template(
+                "✅ {credit_amount_units:.2f} units have been added to your account!\n"
+                "💵 Equivalent to {custom_amount:.2f} dollars and {credit_amount_toman:,} Toman.",
                 user.preferred_language,
+                credit_amount_units=credit_amount_units,
+                custom_amount=custom_amount,
+                credit_amount_toman=int(credit_amount_toman),
             )
             await update.message.reply_text(success_message, reply_markup=reply_markup)
         except ValueError:
             await update.message.reply_text(
-                translate_text(
+                await translate(
                     "❌ Invalid amount. Please enter a valid number. ❌",
                     user.preferred_language,
                 ),
@@ -1049,9 +914,9 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     if context.user_data.get("awaiting_broadcast_message"):
         message = update.message.text
         if broadcast_to == "users":
-            users = session.query(User).filter_by(is_bot=False).all()
+            users = await get_users(session, is_bot=False)
         elif broadcast_to == "admins":
-            users = session.query(User).filter_by(is_admin=True).all()
+            users = await get_users(session, is_admin=True)
         else:
             users = []
 
@@ -1072,12 +937,13 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
         daily_sales = update.message.text
         new_request = AgencyRequest(user_id=user.id, daily_sales=daily_sales)
         session.add(new_request)
-        session.commit()
+        await session.flush()
 
         request_id = new_request.id
-        confirmation_text = translate_text(
-            f"✅ Your request has been added. Admins will review it soon. Your request ID: #{request_id} 🎉",
+        confirmation_text = await translate_template(
+            "✅ Your request has been added. Admins will review it soon. Your request ID: #{request_id} 🎉",
             user.preferred_language,
+            request_id=str(request_id),
         )
 
         await update.message.reply_text(confirmation_text, reply_markup=reply_markup)
@@ -1090,7 +956,7 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
         off_code = update.message.text.strip()
         context.user_data["off_code"] = off_code
         await update.message.reply_text(
-            translate_text(
+            await translate(
                 "🎫 Please enter the discount percent (e.g., 20):",
                 user.preferred_language,
             ),
@@ -1105,7 +971,7 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
         off_code = context.user_data.get("off_code")
         new_code = DiscountCode(code=off_code, discount_percent=discount_percent)
         session.add(new_code)
-        session.commit()
+        await session.flush()
 
         await update.message.reply_text(
             f"✅ Discount code {off_code} with {discount_percent}% discount has been added. 🎁",
@@ -1118,20 +984,20 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     # Applying discount code to a credit increment
     elif context.user_data.get("awaiting_discount_code"):
         discount_code = update.message.text.strip()
-        discount = session.query(DiscountCode).filter_by(code=discount_code).first()
+        discount = await get_discount_code(session, discount_code)
 
         if discount:
             discounted_amount = context.user_data["selected_increment_amount"]
-            user.remaining_credit += int(discounted_amount)
-            session.commit()
+            await add_user_credit(session, user, int(discounted_amount))
 
-            success_message = translate_text(
-                f"✅ {int(discounted_amount)} units have been added to your credit! 💵",
+            success_message = await translate_template(
+                "✅ {discounted_amount} units have been added to your credit! 💵",
                 user.preferred_language,
+                discounted_amount=int(discounted_amount),
             )
             await update.message.reply_text(success_message, reply_markup=reply_markup)
         else:
-            invalid_code_message = translate_text(
+            invalid_code_message = await translate(
                 "❌ Invalid discount code. Adding full amount to your credit. ❌",
                 user.preferred_language,
             )
@@ -1147,7 +1013,7 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     elif context.user_data.get("awaiting_ticket_title"):
         context.user_data["ticket_title"] = update.message.text
         await update.message.reply_text(
-            translate_text(
+            await translate(
                 "🎫 Please enter the description of your ticket: 📝",
                 user.preferred_language,
             ),
@@ -1165,10 +1031,9 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         session.add(new_ticket)
         user.last_ticket_time = datetime.now(timezone.utc)
-        session.commit()
 
         await update.message.reply_text(
-            translate_text(
+            await translate(
                 "✅ Your ticket has been created. Our support team will get back to you soon. 🎟️",
                 user.preferred_language,
             ),
@@ -1182,19 +1047,17 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     elif context.user_data.get("awaiting_ticket_response_text"):
         response_text = update.message.text
         ticket_id = context.user_data.get("responding_ticket_id")
-        ticket = session.query(Ticket).filter_by(id=ticket_id).first()
+        ticket, ticket_user = await get_ticket_with_user(session, ticket_id)
 
         if ticket:
-            user = session.query(User).filter_by(id=ticket.user_id).first()
             await context.bot.send_message(
-                chat_id=user.num_id,
+                chat_id=ticket_user.num_id,
                 text=f"📩 Response to your ticket '{ticket.title}':\n\n{response_text}",
             )
             ticket.status = "closed"
-            session.commit()
 
             await update.message.reply_text(
-                translate_text(
+                await translate(
                     "✅ The ticket has been closed and the response has been sent to the user. 📧",
                     user.preferred_language,
                 )
@@ -1215,22 +1078,22 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     # Handling service ID input for new orders
     elif context.user_data.get("awaiting_service_id"):
         service_id = update.message.text.strip()
-        response = requests.post(API_URL, data={"key": API_KEY, "action": "services"})
-        services = response.json()
-
-        service = next((s for s in services if s["service"] == (service_id)), None)
+        catalog = await get_service_catalog(update, user)
+        if catalog is None:
+            return
+        service = catalog.get_service(service_id)
 
         if service:
             context.user_data["service_id"] = service_id
             await update.message.reply_text(
-                translate_text("🔗 Please enter the Link: (\nBut Please use the right link . if you want instagram post view please give us the link of post not the link of your page) 🌐", user.preferred_language),
+                await translate("🔗 Please enter the Link: (\nBut Please use the right link . if you want instagram post view please give us the link of post not the link of your page) 🌐", user.preferred_language),
                 reply_markup=reply_markup,
             )
             context.user_data["awaiting_link"] = True
             context.user_data["awaiting_service_id"] = False
         else:
             await update.message.reply_text(
-                translate_text(
+                await translate(
                     "❌ Invalid Service ID. Please try again. ❌",
                     user.preferred_language,
                 ),
@@ -1242,47 +1105,58 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     elif context.user_data.get("awaiting_link"):
             link = update.message.text.strip()
             context.user_data["link"] = link
+            # Identifies this checkout so a repeated submission isn't placed twice
+            context.user_data["checkout_key"] = uuid.uuid4().hex
 
             # Fetch service details from the API
             service_id = context.user_data["selected_service_id"]
-            response = requests.post(API_URL, data={"key": API_KEY, "action": "services"})
-            services = response.json()
-            service = next((s for s in services if s["service"] == service_id), None)
+            catalog = await get_service_catalog(update, user)
+            if catalog is None:
+                return
+            service = catalog.get_service(service_id)
 
         
             min_quantity = int(service["min"])
             max_quantity = int(service["max"])
-            service_rate_per_1000 = float(service["rate"])  # Cost per 1000 units
-            unit = session.query(Unit).filter_by(name="default").first()
-            # Fetch user's balance and calculate the maximum allowable quantity
-            user_balance_units = user.remaining_credit  # User's balance in units
-            dollar_to_toman_rate = await get_dollar_to_toman_rate()  # Fetch current conversion rate
+            price = price_table.get(catalog, service_id)
+            if price is None:
+                await update.message.reply_text(
+                    await translate(
+                        "❌ Unit value is not set. Please contact an admin. ❌",
+                        user.preferred_language,
+                    ),
+                    reply_markup=reply_markup,
+                )
+                context.user_data["awaiting_link"] = False
+                return
 
             # Convert user's balance to Toman and Dollar
-            unit_value_in_toman =  (unit.value / 100 ) * dollar_to_toman_rate # Assuming 1 unit = 1000 Toman for this example
-            user_balance_toman = user_balance_units * unit_value_in_toman
-            user_balance_dollar = user_balance_toman / dollar_to_toman_rate
-
-            # Calculate the service rate in dollars
-            service_rate_per_1000_dollars = service_rate_per_1000 / dollar_to_toman_rate
-
-            max_orderable_quantity = int(user_balance_toman * 1000 / service_rate_per_1000)
+            user_balance_toman = price_table.credits_to_toman(user.remaining_credit)
+            user_balance_dollar = price_table.credits_to_dollars(user.remaining_credit)
 
             # Prepare the message to send to the user with emojis
-            quantity_prompt = (
-                f"🔢 *لطفاً تعداد بازدید مورد نظر خود را وارد کنید:*\n"
-                f"💡 *بین* {min_quantity:,} *تا* {max_quantity:,} *بازدید می‌توانید انتخاب کنید.*\n\n"
-                f"💰 *موجودی حساب شما:*\n"
-                f"• {user_balance_toman:,} *تومان*\n"
-                f"• {user_balance_dollar:.2f} *دلار*\n\n"
-                f"🛒 *حداکثر تعداد سفارش بر اساس موجودی شما:* \n\n {max_orderable_quantity:,} *عدد*\n\n"
-                f"💸 *هزینه هر 1000 عدد:*\n"
-                f"• {service_rate_per_1000_dollars:.2f} *دلار*\n"
-                f"• {service_rate_per_1000:,} *تومان*"
+            quantity_prompt = await translate_template(
+                "🔢 *لطفاً تعداد بازدید مورد نظر خود را وارد کنید:*\n"
+                "💡 *بین* {min_quantity:,} *تا* {max_quantity:,} *بازدید می‌توانید انتخاب کنید.*\n\n"
+                "💰 *موجودی حساب شما:*\n"
+                "• {user_balance_toman:,} *تومان*\n"
+                "• {user_balance_dollar:.2f} *دلار*\n\n"
+                "🛒 *حداکثر تعداد سفارش بر اساس موجودی شما:* \n\n {max_orderable_quantity:,} *عدد*\n\n"
+                "💸 *هزینه هر 1000 عدد:*\n"
+                "• {service_rate_per_1000_dollars:.2f} *دلار*\n"
+                "• {service_rate_per_1000:,} *تومان*",
+                user.preferred_language,
+                min_quantity=min_quantity,
+                max_quantity=max_quantity,
+                user_balance_toman=user_balance_toman,
+                user_balance_dollar=user_balance_dollar,
+                max_orderable_quantity=max_orderable_quantity(price, user.remaining_credit),
+                service_rate_per_1000_dollars=price.dollars_per_1000,
+                service_rate_per_1000=price.toman_per_1000,
             )
 
             await update.message.reply_text(
-                translate_text(quantity_prompt, user.preferred_language),
+                quantity_prompt,
                 reply_markup=reply_markup,
                 parse_mode="Markdown",
             )
@@ -1294,114 +1168,67 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     # Handling quantity input for new orders and processing the order
     elif context.user_data.get("awaiting_quantity"):
-        session = Session()
-        user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-
         quantity = int(update.message.text.strip())
         service_id = context.user_data["selected_service_id"]
         link = context.user_data["link"]
 
         # Fetch service details
-        response = requests.post(API_URL, data={"key": API_KEY, "action": "services"})
-        services = response.json()
-        service = next((s for s in services if s["service"] == service_id), None)
+        catalog = await get_service_catalog(update, user)
+        if catalog is None:
+            return
+        service = catalog.get_service(service_id)
 
         if service and int(service["min"]) <= quantity <= int(service["max"]):
-            toman_to_dollar_rate = await get_dollar_to_toman_rate()
-            toman_rate = float(service["rate"]) * quantity / 1000
-            dollar_amount = toman_rate / toman_to_dollar_rate
-
-            unit = session.query(Unit).filter_by(name="default").first()
-            if unit:
-                unit_value_cents = unit.value
-            else:
+            price = price_table.get(catalog, service_id)
+            if price is None:
                 await update.message.reply_text(
-                    translate_text(
+                    await translate(
                         "❌ Unit value is not set. Please contact an admin. ❌",
                         user.preferred_language,
                     ),
                     reply_markup=reply_markup,
                 )
-                session.close()
 
                 return
 
-            total_cost_in_credits = dollar_amount * (100 / unit_value_cents)
-
-            if user.remaining_credit >= total_cost_in_credits:
-                user.remaining_credit -= total_cost_in_credits
-                user.used_credit += total_cost_in_credits
-                session.commit()
-
-                # Placing the order via API
-                add_order_response = requests.post(
-                    API_URL,
-                    data={
-                        "key": API_KEY,
-                        "action": "add",
-                        "service": service_id,
-                        "link": link,
-                        "quantity": quantity,
-                    },
-                )
-
-                order_response = add_order_response.json()
-                order_id = order_response.get("order")
-
-                if order_id:
-                    # Save the order to the database
-                    new_order = Order(
-                        user_id=user.id,
-                        order_id=order_id,
-                        service_id=service_id,
-                        link=link,
-                        quantity=quantity,
-                        status="Pending",
-                    )
-                    session.add(new_order)
-                    session.commit()
-
-                    await update.message.reply_text(
-                        translate_text(
-                            f"💰 {total_cost_in_credits:.2f} credits have been deducted from your account. 💸",
-                            user.preferred_language,
-                        )
-                    )
-                    await update.message.reply_text(
-                        translate_text(
-                            f"🛒 Order registered successfully!\n\n**Order ID:** `{order_id}` 📄",
-                            user.preferred_language,
-                        ),
-                        parse_mode="Markdown",
-                        reply_markup=reply_markup,
-                    )
-                    from config import ORDER_CHANNEL_ID
-
-                    await context.bot.send_message(
-                        chat_id=ORDER_CHANNEL_ID,  # Replace with your actual notification channel ID or chat ID
-                        text=(
-                            f"📢 New Order Received:\n"
-                            f"👤 User: @{user.username}\n"
-                            f"🆔 Order ID: {order_id}\n"
-                            f"💼 Service: {service['name']}\n"
-                            f"🔗 Link: {link}\n"
-                            f"🔢 Quantity: {quantity}"
-                        ),
-                    )
+            total_cost_in_credits = order_cost(price, quantity)
 
+            # The same checkout submitted twice is only queued (and charged) once
+            checkout_key = context.user_data.pop("checkout_key", None) or uuid.uuid4().hex
+            status = await enqueue_order(
+                session, user, checkout_key, service_id, link, quantity, total_cost_in_credits
+            )
 
-                else:
-                    await update.message.reply_text(
-                        translate_text(
-                            "❌ There was an issue placing your order. Please try again later. ❌",
-                            user.preferred_language,
-                        ),
-                        reply_markup=reply_markup,
+            if status == "queued":
+                await update.message.reply_text(
+                    await translate_template(
+                        "💰 {total_cost_in_credits:.2f} credits have been deducted from your account. 💸",
+                        user.preferred_language,
+                        total_cost_in_credits=total_cost_in_credits,
                     )
+                )
+                await update.message.reply_text(
+                    await translate(
+                        "🕒 Your order has been queued and will be placed shortly. You will get a message once it is registered.",
+                        user.preferred_language,
+                    ),
+                    reply_markup=reply_markup,
+                )
+            elif status == "duplicate":
+                await update.message.reply_text(
+                    await translate(
+                        "🕒 This order is already being processed. 🕒",
+                        user.preferred_language,
+                    ),
+                    reply_markup=reply_markup,
+                )
             else:
-                back_button = translate_text("🔙 Back", user.preferred_language)
-                increment_credit_button = translate_text(
-                "💳 Increase Credit", user.preferred_language
+                back_button, increment_credit_button = await translate_many(
+                    [
+                        "🔙 Back",
+                        "💳 Increase Credit",
+                    ],
+                    user.preferred_language,
                 )
                 keyboard = []
                 keyboard.append([
@@ -1414,7 +1241,7 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
                 reply_markup = InlineKeyboardMarkup(keyboard)
 
                 await update.message.reply_text(
-                    translate_text(
+                    await translate(
                         "❌ Insufficient credit to place this order. Please add more credit and try again. ❌",
                         user.preferred_language,
                     ),
@@ -1423,36 +1250,44 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
         else:
 
             await update.message.reply_text(
-                translate_text(
-                    f"❌ Invalid quantity or service ID. Please try again. ❌",
+                await translate(
+                    "❌ Invalid quantity or service ID. Please try again. ❌",
                     user.preferred_language,
                 ),
                 reply_markup=reply_markup,
             )
 
         context.user_data["awaiting_quantity"] = False
-        session.close()
+
+    # Handling pasted lines in mass-order mode
+    elif context.user_data.get("awaiting_mass_order"):
+        await process_mass_order(update, context, session, user, reply_markup)
 
 
     # Handling custom unit value input from admin
     if context.user_data.get("awaiting_unit_value"):
-        unit_value_dollars = float(update.message.text.strip())
+        # "0.1" sets the default unit, "agency 0.08" sets a named unit (pricing tier)
+        *unit_name, unit_value_dollars = update.message.text.split()
+        unit_name = " ".join(unit_name) or DEFAULT_UNIT
+        unit_value_dollars = float(unit_value_dollars)
         unit_value_cents = int(unit_value_dollars * 100)
 
-        unit = session.query(Unit).filter_by(name="default").first()
+        unit = await get_unit(session, unit_name)
         if unit:
             unit.value = unit_value_cents
 
         else:
-            new_unit = Unit(name="default", value=unit_value_cents)
+            new_unit = Unit(name=unit_name, value=unit_value_cents)
             session.add(new_unit)
     
-        session.commit()
+        await session.commit()
+        settings_store.set_unit_value(unit_name, unit_value_cents)
 
         await update.message.reply_text(
-            translate_text(
-                f"✅ Unit value set to ${unit_value_dollars}. 💲",
+            await translate_template(
+                "✅ Unit value set to ${unit_value_dollars}. 💲",
                 user.preferred_language,
+                unit_value_dollars=unit_value_dollars,
             ),
             reply_markup=reply_markup,
         )
@@ -1464,15 +1299,14 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
         response = update.message.text.strip().lower()
 
         if response == "yes":
-            ask_code_message = translate_text(
+            ask_code_message = await translate(
                 "🎟️ Please enter your discount code: 💰", user.preferred_language
             )
             await update.message.reply_text(ask_code_message, reply_markup=reply_markup)
             context.user_data["awaiting_discount_code"] = True
         else:
-            user.remaining_credit += int(context.user_data["selected_increment_amount"])
-            session.commit()
-            ask_code_message = translate_text(
+            await add_user_credit(session, user, int(context.user_data["selected_increment_amount"]))
+            ask_code_message = await translate(
                 "✅ Unit added to account. 🤑", user.preferred_language
             )
             await update.message.reply_text(ask_code_message, reply_markup=reply_markup)
@@ -1481,11 +1315,10 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
     # Handling discount code deletion input from admin
     elif context.user_data.get("awaiting_off_code_deletion"):
         off_code = update.message.text.strip()
-        code_to_delete = session.query(DiscountCode).filter_by(code=off_code).first()
+        code_to_delete = await get_discount_code(session, off_code)
 
         if code_to_delete:
-            session.delete(code_to_delete)
-            session.commit()
+            await session.delete(code_to_delete)
             await update.message.reply_text(
                 f"✅ Discount code {off_code} has been deleted. 🗑️"
             )
@@ -1497,52 +1330,27 @@ async def handle_all_messages(update: Update, context: ContextTypes.DEFAULT_TYPE
         context.user_data["awaiting_off_code_deletion"] = False
         await show_main_menu(update, context, user)
 
-    session.close()
-
-
-# Handle managing orders (viewing, adding, etc.)
-async def handle_manage_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-
-    add_order_button = translate_text("➕ Add Order", user.preferred_language)
-    view_order_button = translate_text("🔍 View Order", user.preferred_language)
-    back_button = translate_text("🔙 Back", user.preferred_language)
-    keyboard = [
-        [InlineKeyboardButton(add_order_button, callback_data="add_order")],
-        [InlineKeyboardButton(view_order_button, callback_data="view_order")],
-        [InlineKeyboardButton(back_button, callback_data="back")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await query.edit_message_text("🛒 Manage Order 🛠️", reply_markup=reply_markup)
-    session.close()
-
 
 # Function to add credit to user's account
 async def add_credit_to_user(update, context, user):
-    session = Session()
-
     try:
-        user = session.query(User).filter_by(id=user.id).first()
-        back_button = translate_text("🔙 Back", user.preferred_language)
+        back_button = await translate("🔙 Back", user.preferred_language)
         keyboard = []
         keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
         reply_markup = InlineKeyboardMarkup(keyboard)
         if user:
             increment_amount = context.user_data["selected_increment_amount"]
-            user.remaining_credit += (increment_amount)
-            session.commit()
+            await add_user_credit(context.session, user, increment_amount)
 
-            success_message = translate_text(
-                f"✅ {increment_amount} units have been added to your credit! 💰",
+            success_message = await translate_template(
+                "✅ {increment_amount} units have been added to your credit! 💰",
                 user.preferred_language,
+                increment_amount=increment_amount,
             )
             await update.message.reply_text(success_message)
         else:
             await update.message.reply_text(
-                translate_text(
+                await translate(
                     "❌ Unable to find the user in the database. ❌",
                     user.preferred_language,
                 )
@@ -1550,26 +1358,22 @@ async def add_credit_to_user(update, context, user):
 
     except Exception as e:
         await update.message.reply_text(
-            translate_text(
+            await translate(
                 "❌ An error occurred while adding credit. Please try again later. ❌",
                 user.preferred_language,
             )
         )
 
-    finally:
-        session.close()
-
 
 # Handle generating and displaying the user's referral link
 
 # Updated function to handle referral link with improved error handling
 async def handle_referral_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
     referral_link = f"https://t.me/Sultanpanel_bot?start={user.num_id}"
-    referral_message = translate_text(
+    referral_message = await translate_template(
         "⚡️ با سلطان پنل به راحتی رشد کنید\n\n"
         "👁‍🗨 افزایش بازدید ویدیو های شما\n"
         "👤 افزایش فالورهای شما\n"
@@ -1580,11 +1384,12 @@ async def handle_referral_link(update: Update, context: ContextTypes.DEFAULT_TYP
         "💯 رایگان ، سریع ، بدون آفلاینی\n"
         "🔐 پرداخت مطمئن و 100% امن\n\n"
         "👇🏻 همین الان وارد این ربات فوق العاده شو\n\n"
-        f"🔗 {referral_link}",
+        "🔗 {referral_link}",
         user.preferred_language,
+        referral_link=referral_link,
     )
 
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = [[InlineKeyboardButton(back_button, callback_data="back")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
@@ -1601,10 +1406,9 @@ async def handle_referral_link(update: Update, context: ContextTypes.DEFAULT_TYP
         print(f"Error sending referral link message: {e}")
         await context.bot.send_message(
             chat_id=query.message.chat_id,
-            text=translate_text("Sorry, something went wrong. Please try again.", user.preferred_language)
+            text=await translate("Sorry, something went wrong. Please try again.", user.preferred_language)
         )
 
-    session.close()
 
 
 
@@ -1612,152 +1416,112 @@ async def handle_referral_link(update: Update, context: ContextTypes.DEFAULT_TYP
 # Handle the admin management section, including adding and removing admins
 async def handle_admin_management(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-
-    add_admin_button = translate_text("➕ Add Admin", user.preferred_language)
-    delete_admin_button = translate_text("➖ Delete Admin", user.preferred_language)
-
-    back_button = translate_text("🔙 Back", user.preferred_language)
-    keyboard = [
-        [InlineKeyboardButton(add_admin_button, callback_data="add_admin")],
-        [InlineKeyboardButton(delete_admin_button, callback_data="delete_admin")],
-        [InlineKeyboardButton(back_button, callback_data="back")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    user = context.profile
 
-    await query.edit_message_text("🔧 Admin Management ⚙️", reply_markup=reply_markup)
-    session.close()
+    text, reply_markup = await keyboard_registry.get(
+        "admin_management", user.preferred_language, user.is_admin
+    )
+    await query.edit_message_text(text, reply_markup=reply_markup)
 
 
 # Handle the management of discount codes by admins
 async def handle_manage_off_codes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-
-    add_code_button = translate_text("➕ Add Off Code", user.preferred_language)
-    view_codes_button = translate_text("📋 View Off Codes", user.preferred_language)
-    delete_code_button = translate_text("➖ Delete Off Code", user.preferred_language)
-    back_button = translate_text("🔙 Back", user.preferred_language)
-    keyboard = [
-        [InlineKeyboardButton(add_code_button, callback_data="add_off_code")],
-        [InlineKeyboardButton(view_codes_button, callback_data="view_off_codes")],
-        [InlineKeyboardButton(delete_code_button, callback_data="delete_off_code")],
-        [InlineKeyboardButton(back_button, callback_data="back")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    user = context.profile
 
-    await query.edit_message_text("🔧 Manage Off Codes 🛠️", reply_markup=reply_markup)
-    session.close()
+    text, reply_markup = await keyboard_registry.get(
+        "manage_off_codes", user.preferred_language, user.is_admin
+    )
+    await query.edit_message_text(text, reply_markup=reply_markup)
 
 
 # Handle adding new discount codes
 async def handle_add_off_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    user = context.profile
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
-        translate_text(
+        await translate(
             "🎟️ Please enter the off code (e.g., SAVE20):", user.preferred_language
         ),
         reply_markup=reply_markup,
     )
     context.user_data["awaiting_off_code"] = True
-    session.close()
 
 
 # Handle viewing existing discount codes
 async def handle_view_off_codes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-
-    admin = (
-        session.query(User)
-        .filter_by(num_id=update.effective_user.id, is_admin=True)
-        .first()
-    )
-    back_button = translate_text("🔙 Back", admin.preferred_language)
+    session = context.session
+    admin = current_admin(context)
+    back_button = await translate("🔙 Back", admin.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     if admin:
-        off_codes = session.query(DiscountCode).all()
+        off_codes = await get_discount_codes(session)
 
         if off_codes:
             code_list = "\n".join(
                 [f"{code.code} - {code.discount_percent}%" for code in off_codes]
             )
             await query.message.reply_text(
-                translate_text(
-                    f"📋 Discount Codes:\n\n{code_list} 🎟️", admin.preferred_language
+                await translate_template(
+                    "📋 Discount Codes:\n\n{code_list} 🎟️",
+                    admin.preferred_language,
+                    code_list=code_list,
                 )
             )
         else:
             await query.message.reply_text(
-                translate_text(
+                await translate(
                     "❌ No discount codes available. ❌", admin.preferred_language
                 )
             )
 
-    session.close()
-
 
 # Handle deletion of discount codes by admin
 async def handle_delete_off_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    user = context.profile
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
-        translate_text(
+        await translate(
             "🗑️ Please enter the off code you want to delete:", user.preferred_language
         ),
         reply_markup=reply_markup,
     )
     context.user_data["awaiting_off_code_deletion"] = True
-    session.close()
 
 
 # Handle broadcasting messages to users or admins
 async def handle_broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-
-    users_button = translate_text("👥 Users", user.preferred_language)
-    admins_button = translate_text("👤 Admins", user.preferred_language)
-    back_button = translate_text("🔙 Back", user.preferred_language)
-    keyboard = [
-        [InlineKeyboardButton(users_button, callback_data="broadcast_users")],
-        [InlineKeyboardButton(admins_button, callback_data="broadcast_admins")],
-        [InlineKeyboardButton(back_button, callback_data="back")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    user = context.profile
 
-    await query.edit_message_text("📢 Broadcast Message" if user.preferred_language == "en" else "📢 اطلاع رسانی پیام", reply_markup=reply_markup)
-    session.close()
+    text, reply_markup = await keyboard_registry.get(
+        "broadcast_message", user.preferred_language, user.is_admin
+    )
+    await query.edit_message_text(text, reply_markup=reply_markup)
 
 
 # Handle broadcasting messages to all users
 async def handle_broadcast_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
-        translate_text(
+        await translate(
             "📢 Please enter the message to broadcast to all users: 📨",
             context.user_data.get("preferred_language"),
         ),
@@ -1765,21 +1529,19 @@ async def handle_broadcast_users(update: Update, context: ContextTypes.DEFAULT_T
     )
     context.user_data["broadcast_to"] = "users"
     context.user_data["awaiting_broadcast_message"] = True
-    session.close()
 
 
 # Handle broadcasting messages to all admins
 async def handle_broadcast_admins(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
-        translate_text(
+        await translate(
             "📢 Please enter the message to broadcast to all admins: 📨",
             context.user_data.get("preferred_language"),
         ),
@@ -1787,22 +1549,20 @@ async def handle_broadcast_admins(update: Update, context: ContextTypes.DEFAULT_
     )
     context.user_data["broadcast_to"] = "admins"
     context.user_data["awaiting_broadcast_message"] = True
-    session.close()
 
 # Handle incrementing the user's credit balance
 async def handle_increment_credit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    user = context.profile
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     # Predefined amounts in dollars (will be converted to units)
-    unit = session.query(Unit).filter_by(name="default").first()
-    if not unit:
+    unit_value_cents = settings_store.unit_value()
+    if not unit_value_cents:
         await query.edit_message_text(
-            translate_text(
+            await translate(
                 "❌ Unit value is not set. Please contact an admin. ❌",
                 user.preferred_language,
             ),
@@ -1810,9 +1570,8 @@ async def handle_increment_credit(update: Update, context: ContextTypes.DEFAULT_
         )
         return
 
-    unit_value_cents = unit.value
     amounts = [1, 5, 10, 50, 100]
-    dollar_to_toman_rate = await get_dollar_to_toman_rate()
+    dollar_to_toman_rate = settings_store.dollar_to_toman_rate
     keyboard = [
         [
             InlineKeyboardButton(
@@ -1822,22 +1581,24 @@ async def handle_increment_credit(update: Update, context: ContextTypes.DEFAULT_
         ]
         for amount in amounts
     ]
-    custom_amount_button = translate_text(
-        "🔢 Enter custom amount", user.preferred_language
+    custom_amount_button, back_button = await translate_many(
+        [
+            "🔢 Enter custom amount",
+            "🔙 Back",
+        ],
+        user.preferred_language,
     )
-    back_button = translate_text("🔙 Back", user.preferred_language)
     keyboard.append(
         [InlineKeyboardButton(custom_amount_button, callback_data="custom_increment")]
     )
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    increment_message = translate_text(
+    increment_message = await translate(
         "💳 Please select the amount of credit you want to add: 🛒",
         user.preferred_language,
     )
     await query.edit_message_text(increment_message, reply_markup=reply_markup)
-    session.close()
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 import random
@@ -1905,8 +1666,7 @@ async def handle_increment_amount_selection(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
     action, amount = query.data.split("_")
     amount = float(amount)
@@ -1919,18 +1679,20 @@ async def handle_increment_amount_selection(
     # Generate the Payeer payment URL
     payeer_url = generate_payeer_url(amount, payment_id, memo)
 
-    # Create glass buttons for both payment methods
-    perfect_money_button = InlineKeyboardButton(
-        translate_text("💵 Pay with Perfect Money", user.preferred_language),
-        url=perfect_money_url
+    perfect_money_label, payeer_label, back_button = await translate_many(
+        [
+            "💵 Pay with Perfect Money",
+            "💳 Pay with Payeer",
+            "🔙 Back",
+        ],
+        user.preferred_language,
     )
 
-    payeer_button = InlineKeyboardButton(
-        translate_text("💳 Pay with Payeer", user.preferred_language),
-        url=payeer_url
-    )
+    # Create glass buttons for both payment methods
+    perfect_money_button = InlineKeyboardButton(perfect_money_label, url=perfect_money_url)
+
+    payeer_button = InlineKeyboardButton(payeer_label, url=payeer_url)
 
-    back_button = translate_text("🔙 Back", user.preferred_language)
     keyboard = [
         [perfect_money_button],
         [payeer_button],
@@ -1938,9 +1700,10 @@ async def handle_increment_amount_selection(
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    payment_message = translate_text(
-        f"💳 To increase your credit by {amount:.2f} USD, please complete the payment using one of the buttons below.",
-        user.preferred_language
+    payment_message = await translate_template(
+        "💳 To increase your credit by {amount:.2f} USD, please complete the payment using one of the buttons below.",
+        user.preferred_language,
+        amount=amount,
     )
 
     context.user_data["selected_increment_amount"] = amount
@@ -1948,76 +1711,67 @@ async def handle_increment_amount_selection(
     context.user_data["payment_id"] = payment_id
 
     await query.edit_message_text(payment_message, reply_markup=reply_markup, parse_mode="Markdown")
-    session.close()
 
 # Handle custom credit increment input
 async def handle_custom_increment(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
-    dollar_to_toman_rate = await get_dollar_to_toman_rate()
+    dollar_to_toman_rate = settings_store.dollar_to_toman_rate
 
-    custom_increment_message = translate_text(
-        f"💵 Please enter the amount in dollars (e.g., 15):\n\n"
-        f"💱 Current Dollar to Toman rate: {dollar_to_toman_rate:,} Toman per Dollar",
-        user.preferred_language
+    custom_increment_message = await translate_template(
+        "💵 Please enter the amount in dollars (e.g., 15):\n\n"
+        "💱 Current Dollar to Toman rate: {dollar_to_toman_rate:,} Toman per Dollar",
+        user.preferred_language,
+        dollar_to_toman_rate=dollar_to_toman_rate,
     )
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text(custom_increment_message, reply_markup=reply_markup)
     context.user_data["awaiting_custom_increment"] = True
-    session.close()
 
 
 
 # Handle managing orders (adding, viewing, custom order ID input)
 async def handle_manage_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
-    add_order_button = translate_text("➕ Add Order", user.preferred_language)
-    view_order_button = translate_text("🔍 View Order", user.preferred_language)
-    custom_order_button = translate_text(
-        "🔍 Enter Custom Order ID", user.preferred_language
+    text, reply_markup = await keyboard_registry.get(
+        "manage_order", user.preferred_language, user.is_admin
     )
-    back_button = translate_text("🔙 Back", user.preferred_language)
-
-    keyboard = [
-        [InlineKeyboardButton(add_order_button, callback_data="add_order")],
-        [InlineKeyboardButton(view_order_button, callback_data="view_order")],
-        [InlineKeyboardButton(custom_order_button, callback_data="custom_order_id")],
-        [InlineKeyboardButton(back_button, callback_data="back")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await query.edit_message_text("🛒 Manage Order 🛠️", reply_markup=reply_markup)
-    session.close()
+    await query.edit_message_text(text, reply_markup=reply_markup)
 
 
 # Handle the process of checking the status of an order
 async def process_order_status(
     update: Update, context: ContextTypes.DEFAULT_TYPE, order_id
 ):
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-    order = session.query(Order).filter_by(order_id=order_id).first()
-    response = requests.post(
-        API_URL, data={"key": API_KEY, "action": "status", "order": order_id}
-    )
-    order_status = response.json()
-
-    start_count = int(float(order_status.get("start_count") or 0))
+    session = context.session
+    user = context.profile
+    order = await get_order(session, order_id)
+    try:
+        order_status = await fetch_order_status(order_id, order)
+    except ProviderError as e:
+        print(f"Failed to fetch order status: {e}")
+        await update.effective_message.reply_text(
+            await translate(
+                "❌ Could not fetch the order status. Please try again later. ❌",
+                user.preferred_language,
+            )
+        )
+        context.user_data["awaiting_order_id"] = False
+        return
 
-    remains = float(order_status.get("remains", 0))
-    charge = float(order_status.get("charge", 0))
+    start_count = order_status.start_count
+    remains = order_status.remains
+    charge = order_status.charge
     
     # Convert charge to Dollar
-    dollar_to_toman_rate = await get_dollar_to_toman_rate()
+    dollar_to_toman_rate = settings_store.dollar_to_toman_rate
     charge_dollar = charge / dollar_to_toman_rate
     
     total_count = start_count + order.quantity
@@ -2035,36 +1789,33 @@ async def process_order_status(
     )
     progress_message = f"{battery_status} {percentage_complete}%"
 
-    status_mapping = {
-        "Pending": "🟡",
-        "In Progress": "🔵",
-        "Completed": "🟢",
-        "Canceled": "🔴",
-    }
+    status = order_status.status
+    status_emoji = ORDER_STATUS_EMOJIS.get(status, "❓")
 
-    status = order_status.get("status", "Unknown")
-    status_emoji = status_mapping.get(status, "❓")
 
-    status_message = (
-        
-        f"🔍 **Order Status:**\n\n"
-        f"**Order id:** `{order_id}` 📄\n"
-        f"💵 **Order cost:** {charge:,.0f} Toman ({charge_dollar:,.2f} $)\n"  # Formatted values
-        f"📊 **Start Count:** {start_count}\n"
-        f"{progress_message}\n"
-        f"⏳ **Remains:** {remains} pcs\n"
-        f"{status_emoji} **Status:** {status}\n"
-        f"💸 **Currency:** {order_status.get('currency', 'N/A')}"
-    )
-
-    # Update the order status in the database
-    order = session.query(Order).filter_by(order_id=order_id).first()
-    if order and order.status != status:
-        order.status = status
-        session.commit()
-
-    translated_message = translate_text(status_message, user.preferred_language)
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    status_label, back_button = await translate_many(
+        [status, "🔙 Back"], user.preferred_language
+    )
+    translated_message = await translate_template(
+        "🔍 **Order Status:**\n\n"
+        "**Order id:** `{order_id}` 📄\n"
+        "💵 **Order cost:** {charge:,.0f} Toman ({charge_dollar:,.2f} $)\n"
+        "📊 **Start Count:** {start_count}\n"
+        "{progress_message}\n"
+        "⏳ **Remains:** {remains} pcs\n"
+        "{status_emoji} **Status:** {status}\n"
+        "💸 **Currency:** {currency}",
+        user.preferred_language,
+        order_id=str(order_id),
+        charge=charge,
+        charge_dollar=charge_dollar,
+        start_count=start_count,
+        progress_message=progress_message,
+        remains=remains,
+        status_emoji=status_emoji,
+        status=status_label,
+        currency=order_status.currency,
+    )
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -2080,28 +1831,48 @@ async def process_order_status(
 
     context.user_data["awaiting_order_id"] = False
 
-    session.close()
 
 
 
 # Handle custom order ID input
 async def handle_custom_order_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    user = context.profile
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
-        translate_text("🔢 Please enter the Order ID: 📄", user.preferred_language),
+        await translate("🔢 Please enter the Order ID: 📄", user.preferred_language),
         reply_markup=reply_markup,
     )
     context.user_data["awaiting_order_id_input"] = True
-    session.close()
 
 
 
+# The provider's service catalog, or None after telling the user it couldn't be
+# loaded (only possible until the first download succeeds)
+async def get_service_catalog(update, user):
+    try:
+        return await service_catalog.get()
+    except ServiceCatalogUnavailable:
+        back_button, message = await translate_many(
+            [
+                "🔙 Back",
+                "❌ The service list is unavailable right now. Please try again later. ❌",
+            ],
+            user.preferred_language,
+        )
+        reply_markup = InlineKeyboardMarkup(
+            [[InlineKeyboardButton(back_button, callback_data="back")]]
+        )
+        if update.callback_query:
+            await update.callback_query.edit_message_text(message, reply_markup=reply_markup)
+        else:
+            await update.message.reply_text(message, reply_markup=reply_markup)
+        return None
+
+
 # Function to strip emojis for filtering
 def strip_emoji(text):
     return ''.join(c for c in text if c.isalnum() or c.isspace())
@@ -2109,241 +1880,899 @@ def strip_emoji(text):
 # Handle adding a new order by selecting platform, service, and quantity
 async def handle_add_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
-    response = requests.post(API_URL, data={"key": API_KEY, "action": "services"})
-    services = response.json()
-    
-    platforms = {platform: [] for platform in SOCIAL_MEDIA_PLATFORMS}
-    for service in services:
-        for platform, platform_key in SOCIAL_MEDIA_PLATFORMS.items():
-            if platform_key in service["category"]:
-                platforms[platform].append(service)
-                break
-    
-    platforms = {platform: services for platform, services in platforms.items() if services}
+    catalog = await get_service_catalog(update, user)
+    if catalog is None:
+        return
+    platforms = list(catalog.platforms.values())
 
+    *platform_labels, back_button, select_message = await translate_many(
+        [platform.label for platform in platforms]
+        + ["🔙 Back", "🌐 Please select a social media platform: 📱"],
+        user.preferred_language,
+    )
     keyboard = [
-        [InlineKeyboardButton(translate_text(platform,user.preferred_language), callback_data=f"platform_{i}")]
-        for i, platform in enumerate(platforms.keys())
+        [InlineKeyboardButton(label, callback_data=f"platform_{platform.id}")]
+        for label, platform in zip(platform_labels, platforms)
     ]
-    back_button = translate_text("🔙 Back", user.preferred_language)
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    await query.edit_message_text(
-        translate_text(
-            "🌐 Please select a social media platform: 📱", user.preferred_language
-        ),
-        reply_markup=reply_markup,
-    )
-
-    context.user_data["platforms"] = list(platforms.items())
-    session.close()
+    await query.edit_message_text(select_message, reply_markup=reply_markup)
 
 # Handle platform selection when adding a new order
 async def handle_platform_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-
-    platform_index = int(query.data.split("_")[1])
-    platform, services = context.user_data["platforms"][platform_index]
+    user = context.profile
 
-    context.user_data["platform_index"] = platform_index
+    platform_id = int(query.data.split("_")[1])
+    catalog = await get_service_catalog(update, user)
+    if catalog is None:
+        return
+    platform = catalog.get_platform(platform_id)
 
-    categories = {}
-    for service in services:
-        category = service["category"]
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(service)
+    if platform is None:
+        # The catalog changed since this keyboard was sent; start over
+        await handle_add_order(update, context)
+        return
 
+    categories = list(platform.categories.values())
+    *category_labels, back_button, platform_label = await translate_many(
+        [category.name[:80] for category in categories] + ["🔙 Back", platform.label],
+        user.preferred_language,
+    )
     keyboard = [
-        [InlineKeyboardButton(translate_text(category[:80],user.preferred_language), callback_data=f"category_{i}")]
-        for i, category in enumerate(categories.keys())
+        [InlineKeyboardButton(label, callback_data=f"category_{category.id}")]
+        for label, category in zip(category_labels, categories)
     ]
-    back_button = translate_text("🔙 Back", user.preferred_language)
     keyboard.append([InlineKeyboardButton(back_button, callback_data="add_order")])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text(
-        translate_text(
-            f"📂 Please select a category under {platform}: 📂", user.preferred_language
+        await translate_template(
+            "📂 Please select a category under {platform}: 📂",
+            user.preferred_language,
+            platform=platform_label,
         ),
         reply_markup=reply_markup,
     )
 
-    context.user_data["categories"] = list(categories.items())
-    session.close()
-
 
 # Handle category selection when adding a new order
 async def handle_category_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
-    category_index = int(query.data.split("_")[1])
-    category, services = context.user_data["categories"][category_index]
+    category_id = int(query.data.split("_")[1])
+    catalog = await get_service_catalog(update, user)
+    if catalog is None:
+        return
+    entry = catalog.get_category(category_id)
 
-    platform_index = context.user_data["platform_index"]
+    if entry is None:
+        # The catalog changed since this keyboard was sent; start over
+        await handle_add_order(update, context)
+        return
 
+    platform_id, category = entry
+    services = category.services
+
+    *service_labels, back_button, category_label = await translate_many(
+        [service["name"][:80] for service in services] + ["🔙 Back", category.name],
+        user.preferred_language,
+    )
     keyboard = [
         [
             InlineKeyboardButton(
-                translate_text(service["name"][:80],user.preferred_language), callback_data=f"service_{service['service']}"
+                label, callback_data=f"service_{service['service']}"
             )
         ]
-        for service in services
+        for label, service in zip(service_labels, services)
     ]
-    back_button = translate_text("🔙 Back", user.preferred_language)
     keyboard.append(
-        [InlineKeyboardButton(back_button, callback_data=f"platform_{platform_index}")]
+        [InlineKeyboardButton(back_button, callback_data=f"platform_{platform_id}")]
     )
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await query.edit_message_text(
-        translate_text(
-            f"📄 Please select a service in {category}: 📄", user.preferred_language
+        await translate_template(
+            "📄 Please select a service in {category}: 📄",
+            user.preferred_language,
+            category=category_label,
         ),
         reply_markup=reply_markup,
     )
-    session.close()
 
 
 # Handle service selection when adding a new order
 async def handle_service_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
     service_id = query.data.split("_")[1]
     context.user_data["selected_service_id"] = service_id
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    back_button, mass_order_button = await translate_many(
+        ["🔙 Back", "📦 Mass Order (many links)"], user.preferred_language
+    )
     keyboard = []
+    keyboard.append([InlineKeyboardButton(mass_order_button, callback_data="mass_order")])
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
-        translate_text("🔗 Please enter the Link: \n(But Please use the right link . if you want instagram post comment please give us the link of post not the link of your page) 🌐", user.preferred_language),
+        await translate("🔗 Please enter the Link: \n(But Please use the right link . if you want instagram post comment please give us the link of post not the link of your page) 🌐", user.preferred_language),
         reply_markup=reply_markup,
     )
     context.user_data["awaiting_link"] = True
-    session.close()
+    context.user_data["awaiting_mass_order"] = False
 
 
-# Handle viewing user's past orders and paginating through them
-async def handle_view_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# Switch the selected service to mass-order mode: one order per pasted line
+async def handle_mass_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
+    user = context.profile
+
+    back_button = await translate("🔙 Back", user.preferred_language)
+    reply_markup = InlineKeyboardMarkup(
+        [[InlineKeyboardButton(back_button, callback_data="back")]]
+    )
+    await query.edit_message_text(
+        await translate_template(
+            "📦 Send one order per line as `link|quantity` (up to {max_lines} lines).\n\n"
+            "Example:\n`https://instagram.com/p/abc|1000`",
+            user.preferred_language,
+            max_lines=str(MASS_ORDER_MAX_LINES),
+        ),
+        reply_markup=reply_markup,
+        parse_mode="Markdown",
+    )
+    context.user_data["awaiting_mass_order"] = True
+    context.user_data["awaiting_link"] = False
+    context.user_data["checkout_key"] = uuid.uuid4().hex
+
+
+# Ids of QueuedOrder rows waiting for a worker
+order_queue = asyncio.Queue()
+order_workers = []
+
+
+# Charge the user and queue checkouts in one transaction. Returns "queued",
+# "duplicate" if any of their idempotency keys was already queued, or
+# "insufficient credit". The balance is checked by the charge itself, a
+# conditional UPDATE, never against the row the handler loaded earlier.
+async def enqueue_orders(session, user, queued_orders):
+    keys = [queued_order.idempotency_key for queued_order in queued_orders]
+    if await idempotency_keys_exist(session, keys):
+        return "duplicate"
+
+    cost = sum(queued_order.cost for queued_order in queued_orders)
+    if not await charge_user_credit(session, user, cost):
+        return "insufficient credit"
+    session.add_all(queued_orders)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        # The rollback expired the user; reload it so callers can keep using it
+        await session.refresh(user)
+        return "duplicate"
+    return "queued"
+
+
+# Send a checkout the provider never received through the queue again once the
+# circuit breaker has had time to let calls through
+def requeue_later(queued_order_id):
+    asyncio.get_running_loop().call_later(
+        ORDER_RETRY_DELAY, order_queue.put_nowait, queued_order_id
+    )
+
+
+# Order row for a checkout the provider accepted. Nothing is delivered yet, so
+# remains starts at the full quantity, which gives the first poll a baseline.
+def placed_order(queued_order, order_id):
+    return Order(
+        user_id=queued_order.user_id,
+        order_id=order_id,
+        service_id=queued_order.service_id,
+        link=queued_order.link,
+        quantity=queued_order.quantity,
+        status="Pending",
+        remains=queued_order.quantity,
+    )
+
+
+def unconfirmed_order_line(queued_order):
+    return (
+        f"#{queued_order.id} user {queued_order.user_id}, service {queued_order.service_id}, "
+        f"{queued_order.quantity} × {queued_order.link} ({queued_order.cost:.2f} credits): "
+        f"{queued_order.error}"
+    )
+
+
+# Tell admins about checkouts that may or may not exist at the provider; they
+# check the provider panel and settle each one with /resolve_order
+async def report_unconfirmed_orders(bot, queued_orders):
+    try:
+        await bot.send_message(
+            chat_id=ORDER_CHANNEL_ID,
+            text=(
+                "⚠️ Unconfirmed orders. Check them on the provider panel, then run "
+                "/resolve_order <id> <provider order id> or /resolve_order <id> refund:\n\n"
+                + "\n".join(unconfirmed_order_line(queued_order) for queued_order in queued_orders)
+            ),
+        )
+    except Exception as e:
+        print(f"Failed to report unconfirmed orders: {e}")
+
+
+# Queue a single checkout for the order workers; returns what enqueue_orders does
+async def enqueue_order(session, user, idempotency_key, service_id, link, quantity, cost):
+    queued_order = QueuedOrder(
+        idempotency_key=idempotency_key,
+        user_id=user.id,
+        service_id=str(service_id),
+        link=link,
+        quantity=quantity,
+        cost=cost,
+    )
+    status = await enqueue_orders(session, user, [queued_order])
+    if status == "queued":
+        order_queue.put_nowait(queued_order.id)
+    return status
+
+
+# Parse pasted `link|quantity` lines; returns the valid (link, quantity) pairs and
+# the numbers of the lines that are malformed or outside the service's limits
+def parse_mass_order(text, service):
+    orders = []
+    invalid_lines = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        link, separator, quantity = line.rpartition("|")
+        link = link.strip()
+        quantity = quantity.strip()
+        if (
+            separator
+            and link
+            and quantity.isdigit()
+            and int(service["min"]) <= int(quantity) <= int(service["max"])
+        ):
+            orders.append((link, int(quantity)))
+        else:
+            invalid_lines.append(number)
+    return orders, invalid_lines
+
+
+# Handle the pasted lines of a mass order: validate them, check the total price
+# against the user's credit once and queue every line in one transaction
+async def process_mass_order(update, context, session, user, reply_markup):
+    service_id = context.user_data["selected_service_id"]
+    catalog = await get_service_catalog(update, user)
+    if catalog is None:
+        return
+    service = catalog.get_service(service_id)
+    if not service:
+        await update.message.reply_text(
+            await translate("❌ Invalid Service ID. Please try again. ❌", user.preferred_language),
+            reply_markup=reply_markup,
+        )
+        context.user_data["awaiting_mass_order"] = False
+        return
+
+    orders, invalid_lines = parse_mass_order(update.message.text, service)
+    if invalid_lines or not orders or len(orders) > MASS_ORDER_MAX_LINES:
+        await update.message.reply_text(
+            await translate_template(
+                "❌ Please check your lines. Each line must be `link|quantity` with a quantity "
+                "between {min} and {max}, and at most {max_lines} lines.\n"
+                "Invalid lines: {invalid_lines}",
+                user.preferred_language,
+                min=int(service["min"]),
+                max=int(service["max"]),
+                max_lines=MASS_ORDER_MAX_LINES,
+                invalid_lines=", ".join(map(str, invalid_lines)) or "-",
+            ),
+            reply_markup=reply_markup,
+            parse_mode="Markdown",
+        )
+        return
+
+    price = price_table.get(catalog, service_id)
+    if price is None:
+        await update.message.reply_text(
+            await translate(
+                "❌ Unit value is not set. Please contact an admin. ❌",
+                user.preferred_language,
+            ),
+            reply_markup=reply_markup,
+        )
+        return
+
+    total_cost_in_credits = order_cost(price, sum(quantity for _, quantity in orders))
+
+    checkout_key = context.user_data.pop("checkout_key", None) or uuid.uuid4().hex
+    queued_orders = [
+        QueuedOrder(
+            idempotency_key=f"{checkout_key}:{line}",
+            user_id=user.id,
+            service_id=str(service_id),
+            link=link,
+            quantity=quantity,
+            cost=order_cost(price, quantity),
+        )
+        for line, (link, quantity) in enumerate(orders)
+    ]
+    status = await enqueue_orders(session, user, queued_orders)
+    context.user_data["awaiting_mass_order"] = False
+    if status == "duplicate":
+        await update.message.reply_text(
+            await translate("🕒 This order is already being processed. 🕒", user.preferred_language),
+            reply_markup=reply_markup,
+        )
+        return
+    if status == "insufficient credit":
+        back_button, increment_credit_button = await translate_many(
+            ["🔙 Back", "💳 Increase Credit"], user.preferred_language
+        )
+        keyboard = [
+            [InlineKeyboardButton(increment_credit_button, callback_data="increment_credit")],
+            [InlineKeyboardButton(back_button, callback_data="back")],
+        ]
+        await update.message.reply_text(
+            await translate(
+                "❌ Insufficient credit to place this order. Please add more credit and try again. ❌",
+                user.preferred_language,
+            ),
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+        return
+
+    await update.message.reply_text(
+        await translate_template(
+            "💰 {total_cost_in_credits:.2f} credits have been deducted from your account. 💸",
+            user.preferred_language,
+            total_cost_in_credits=total_cost_in_credits,
+        )
+    )
+    await update.message.reply_text(
+        await translate_template(
+            "🕒 {count} orders have been queued. You will get a summary once they are placed.",
+            user.preferred_language,
+            count=len(queued_orders),
+        ),
+        reply_markup=reply_markup,
+    )
+    context.application.create_task(
+        place_mass_order(context.bot, [queued_order.id for queued_order in queued_orders])
+    )
+
+
+# Service name for admin notices; the id when the catalog can't be loaded
+async def service_name(service_id):
+    try:
+        service = (await service_catalog.get()).get_service(service_id)
+    except ServiceCatalogUnavailable:
+        service = None
+    return service["name"] if service else service_id
+
+
+# Send the lines of a mass order to the provider with bounded concurrency, store
+# the placed orders with one bulk insert, refund the failures and send one summary
+async def place_mass_order(bot, queued_order_ids):
+    session = Session()
+    try:
+        queued_orders = await get_waiting_queued_orders(session, queued_order_ids)
+        if not queued_orders:
+            return
+        for queued_order in queued_orders:
+            queued_order.status = "processing"
+        await session.commit()
+
+        semaphore = asyncio.Semaphore(MASS_ORDER_CONCURRENCY)
+
+        async def place(queued_order):
+            async with semaphore:
+                try:
+                    return await provider.add_order(
+                        queued_order.service_id, queued_order.link, queued_order.quantity
+                    ), None
+                except ProviderError as e:
+                    return None, e
+
+        results = await asyncio.gather(*(place(queued_order) for queued_order in queued_orders))
+
+        user = await get_user_by_id(session, queued_orders[0].user_id)
+        new_orders = []
+        summary_lines = []
+        refund = 0
+        retried = []
+        unconfirmed = []
+        for queued_order, (order_id, error) in zip(queued_orders, results):
+            link = queued_order.link if len(queued_order.link) <= 40 else queued_order.link[:37] + "..."
+            if isinstance(error, ProviderNotReached):
+                # Never sent; the workers place it on its own once the provider is back
+                queued_order.status = "queued"
+                retried.append(queued_order)
+                summary_lines.append(f"⏳ {link}")
+            elif error is not None and not isinstance(error, ProviderRejected):
+                # The provider may have created it; an admin settles it
+                print(f"Could not confirm queued order {queued_order.id}: {error}")
+                queued_order.status = "unconfirmed"
+                queued_order.error = str(error)
+                unconfirmed.append(queued_order)
+                summary_lines.append(f"⏳ {link}")
+            elif order_id:
+                queued_order.status = "placed"
+                queued_order.order_id = order_id
+                new_orders.append(
+                    placed_order(queued_order, order_id)
+                )
+                summary_lines.append(f"✅ {link} → {order_id}")
+            else:
+                print(f"Failed to place queued order {queued_order.id}: {error}")
+                queued_order.status = "failed"
+                queued_order.error = str(error)
+                refund += queued_order.cost
+                summary_lines.append(f"❌ {link}")
+
+        if refund:
+            await refund_user_credit(session, user, refund)
+        await session.run_sync(lambda sync_session: sync_session.bulk_save_objects(new_orders))
+        await session.commit()
+        for queued_order in retried:
+            requeue_later(queued_order.id)
+        if unconfirmed:
+            await report_unconfirmed_orders(bot, unconfirmed)
+
+        back_button = await translate("🔙 Back", user.preferred_language)
+        summary = await translate_template(
+            "📦 Mass order finished: {placed} of {total} orders placed.\n"
+            "💰 {refund:.2f} credits have been refunded for the failed orders.",
+            user.preferred_language,
+            placed=len(new_orders),
+            total=len(queued_orders),
+            refund=refund,
+        )
+        if retried or unconfirmed:
+            summary += "\n" + await translate_template(
+                "⏳ {pending} orders are still being confirmed with the provider; you will be notified once they are settled.",
+                user.preferred_language,
+                pending=len(retried) + len(unconfirmed),
+            )
+        await bot.send_message(
+            chat_id=user.num_id,
+            text=summary + "\n\n" + "\n".join(summary_lines),
+            reply_markup=InlineKeyboardMarkup(
+                [[InlineKeyboardButton(back_button, callback_data="back")]]
+            ),
+        )
+
+        if new_orders:
+            service = await service_name(queued_orders[0].service_id)
+            await bot.send_message(
+                chat_id=ORDER_CHANNEL_ID,
+                text=(
+                    f"📢 New Mass Order Received:\n"
+                    f"👤 User: @{user.username}\n"
+                    f"💼 Service: {service}\n"
+                    f"🔢 Orders: {len(new_orders)}\n"
+                    f"🆔 Order IDs: {', '.join(str(order.order_id) for order in new_orders)}"
+                ),
+            )
+    finally:
+        await session.close()
+
+
+# Send one queued checkout to the provider, then confirm it or refund the user
+async def place_queued_order(bot, queued_order_id):
+    session = Session()
+    try:
+        queued_order = await get_queued_order(session, queued_order_id)
+        if queued_order is None or queued_order.status != "queued":
+            return
+        queued_order.status = "processing"
+        await session.commit()
+
+        user = await get_user_by_id(session, queued_order.user_id)
+        back_button = await translate("🔙 Back", user.preferred_language)
+        reply_markup = InlineKeyboardMarkup(
+            [[InlineKeyboardButton(back_button, callback_data="back")]]
+        )
+
+        try:
+            order_id = await provider.add_order(
+                queued_order.service_id, queued_order.link, queued_order.quantity
+            )
+        except ProviderNotReached as e:
+            # Never sent, so nothing to refund: try again once the provider is back
+            print(f"Queued order {queued_order.id} not sent, retrying later: {e}")
+            queued_order.status = "queued"
+            await session.commit()
+            requeue_later(queued_order.id)
+            return
+        except ProviderRejected as e:
+            print(f"Failed to place queued order {queued_order.id}: {e}")
+            queued_order.status = "failed"
+            queued_order.error = str(e)
+            await refund_user_credit(session, user, queued_order.cost)
+            await session.commit()
+
+            await bot.send_message(
+                chat_id=user.num_id,
+                text=await translate_template(
+                    "❌ There was an issue placing your order. {cost:.2f} credits have been refunded to your account. ❌",
+                    user.preferred_language,
+                    cost=queued_order.cost,
+                ),
+                reply_markup=reply_markup,
+            )
+            return
+        except ProviderError as e:
+            # The request may have created the order (e.g. a read timeout), so the
+            # credit stays deducted until an admin settles it
+            print(f"Could not confirm queued order {queued_order.id}: {e}")
+            queued_order.status = "unconfirmed"
+            queued_order.error = str(e)
+            await session.commit()
+
+            await bot.send_message(
+                chat_id=user.num_id,
+                text=await translate(
+                    "⏳ Your order is still being confirmed with the provider. You will be notified once it is settled.",
+                    user.preferred_language,
+                ),
+                reply_markup=reply_markup,
+            )
+            await report_unconfirmed_orders(bot, [queued_order])
+            return
+
+        queued_order.status = "placed"
+        queued_order.order_id = order_id
+        session.add(
+            placed_order(queued_order, order_id)
+        )
+        await session.commit()
+
+        await bot.send_message(
+            chat_id=user.num_id,
+            text=await translate_template(
+                "🛒 Order registered successfully!\n\n**Order ID:** `{order_id}` 📄",
+                user.preferred_language,
+                order_id=str(order_id),
+            ),
+            parse_mode="Markdown",
+            reply_markup=reply_markup,
+        )
+
+        service = await service_name(queued_order.service_id)
+        await bot.send_message(
+            chat_id=ORDER_CHANNEL_ID,
+            text=(
+                f"📢 New Order Received:\n"
+                f"👤 User: @{user.username}\n"
+                f"🆔 Order ID: {order_id}\n"
+                f"💼 Service: {service}\n"
+                f"🔗 Link: {queued_order.link}\n"
+                f"🔢 Quantity: {queued_order.quantity}"
+            ),
+        )
+    finally:
+        await session.close()
+
+
+async def order_worker(bot):
+    while True:
+        queued_order_id = await order_queue.get()
+        try:
+            await place_queued_order(bot, queued_order_id)
+        except Exception as e:
+            print(f"Order worker failed on queued order {queued_order_id}: {e}")
+        finally:
+            order_queue.task_done()
+
+
+# Start the queue workers and pick up checkouts queued before a restart. Orders
+# left in "processing" may already exist at the provider, so they're marked
+# unconfirmed and reported to admins to settle.
+async def start_order_workers(bot):
     session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    try:
+        interrupted = []
+        for queued_order in await get_unfinished_queued_orders(session):
+            if queued_order.status == "queued":
+                order_queue.put_nowait(queued_order.id)
+            else:
+                queued_order.status = "unconfirmed"
+                queued_order.error = "interrupted by a restart"
+                interrupted.append(queued_order)
+        await session.commit()
+        if interrupted:
+            await report_unconfirmed_orders(bot, interrupted)
+    finally:
+        await session.close()
+
+    for _ in range(ORDER_QUEUE_WORKERS):
+        order_workers.append(asyncio.create_task(order_worker(bot)))
+
+
+# Fetch the live status of many orders with bulk provider requests and copy the
+# changes onto the rows for the caller to commit; returns order id -> OrderStatus
+# for the orders found
+async def refresh_order_statuses(orders):
+    open_orders = [order for order in orders if order.status not in FINAL_ORDER_STATUSES]
+    if not open_orders:
+        return {}
 
-    orders = (
-        session.query(Order)
-        .filter_by(user_id=user.id)
-        .order_by(Order.timestamp.desc())
-        .all()
+    try:
+        statuses = await provider.orders_status([order.order_id for order in open_orders])
+    except ProviderError as e:
+        print(f"Failed to fetch order statuses: {e}")
+        return {}
+    order_status_cache.put(statuses.values())
+
+    for order in open_orders:
+        order_status = statuses.get(str(order.order_id))
+        if order_status:
+            save_order_status(order, order_status)
+    return statuses
+
+
+# Provider details last saved on an order row
+def stored_order_status(order):
+    return OrderStatus(
+        order_id=str(order.order_id),
+        status=order.status,
+        charge=order.charge or 0.0,
+        start_count=order.start_count or 0,
+        remains=order.remains or 0.0,
+        currency=order.currency or "N/A",
+    )
+
+
+# Copy provider details onto an order row; True if anything changed
+def save_order_status(order, order_status):
+    if stored_order_status(order) == order_status and order.charge is not None:
+        return False
+    order.status = order_status.status
+    order.charge = order_status.charge
+    order.start_count = order_status.start_count
+    order.remains = order_status.remains
+    order.currency = order_status.currency
+    return True
+
+
+# Status of a single order. Final orders are served from the orders table; open
+# ones go through the short-TTL cache shared by every user and are saved back.
+# While the provider is unavailable the last saved details are served instead.
+async def fetch_order_status(order_id, order=None):
+    if order is not None and order.status in FINAL_ORDER_STATUSES and order.charge is not None:
+        return stored_order_status(order)
+
+    try:
+        order_status = await order_status_cache.get(order_id)
+    except ProviderUnavailable:
+        if order is None or order.charge is None:
+            raise
+        return stored_order_status(order)
+    if order is not None:
+        save_order_status(order, order_status)
+    return order_status
+
+
+# Seconds between polls of an open order, backing off as the order gets older
+def order_poll_interval(order):
+    timestamp = order.timestamp
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    age = (datetime.now(timezone.utc) - timestamp).total_seconds()
+    for max_age, interval in ORDER_POLL_BACKOFF:
+        if age <= max_age:
+            return interval
+    return ORDER_POLL_MAX_INTERVAL
+
+
+# Tell a user that one of their orders moved on
+async def notify_order_update(bot, user, order_status):
+    status_label = await translate(order_status.status, user.preferred_language)
+    message = await translate_template(
+        "🔔 **Order update**\n\n"
+        "**Order id:** `{order_id}` 📄\n"
+        "{status_emoji} **Status:** {status}\n"
+        "⏳ **Remains:** {remains} pcs",
+        user.preferred_language,
+        order_id=order_status.order_id,
+        status_emoji=ORDER_STATUS_EMOJIS.get(order_status.status, "❓"),
+        status=status_label,
+        remains=int(order_status.remains),
     )
-    orders_per_page = 10  # Number of orders to display per page
-    context.user_data["total_orders"] = len(orders)
-    context.user_data["current_page"] = 0
+    try:
+        await bot.send_message(chat_id=user.num_id, text=message, parse_mode="Markdown")
+    except Exception as e:
+        print(f"Failed to notify user {user.num_id} about order {order_status.order_id}: {e}")
 
-    await show_orders_page(update, context, user, orders, 0)
-    session.close()
+
+# JobQueue callback: poll the open orders that are due with bulk status requests,
+# schedule their next poll, save everything in one commit and notify users whose
+# order status or progress moved
+async def poll_order_statuses(context: ContextTypes.DEFAULT_TYPE):
+    session = Session()
+    try:
+        now = datetime.now(timezone.utc)
+        due_orders = await get_due_orders(session, now, ORDER_POLL_BATCH_SIZE)
+        if not due_orders:
+            return
+
+        previous = {order.order_id: (order.status, order.remains) for order in due_orders}
+        owners = {order.order_id: order.user_id for order in due_orders}
+        statuses = await refresh_order_statuses(due_orders)
+        for order in due_orders:
+            order.next_poll_at = now + timedelta(seconds=order_poll_interval(order))
+        await session.commit()
+
+        changed = []
+        for order_id, (old_status, old_remains) in previous.items():
+            order_status = statuses.get(str(order_id))
+            # Orders saved before details were stored are only brought up to date
+            # on their first poll; their old status changes aren't news to anyone
+            if order_status is None or old_remains is None:
+                continue
+
+            if order_status.status != old_status or order_status.remains != old_remains:
+                changed.append(order_status)
+        if not changed:
+            return
+
+        users = {
+            user.id: user
+            for user in await get_users_by_ids(session, set(owners.values()))
+        }
+        for order_status in changed:
+            user = users.get(owners[int(order_status.order_id)])
+            if user:
+                await notify_order_update(context.bot, user, order_status)
+    finally:
+        await session.close()
+
+
+# Handle viewing user's past orders and paginating through them
+async def handle_view_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = context.profile
+
+    orders, more = await get_user_orders_page(context.session, user.id, ORDERS_PAGE_SIZE)
+    await show_orders_page(update, context, user, orders, has_previous=False, has_next=more)
+
+
+ORDER_CURSOR_EPOCH = datetime(1970, 1, 1)
+
+
+# Page cursor for callback_data: the order's (timestamp, id) key as
+# "<microseconds since the epoch>_<id>", short enough for Telegram's 64 bytes
+def order_cursor(order):
+    timestamp = order.timestamp
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return f"{(timestamp - ORDER_CURSOR_EPOCH) // timedelta(microseconds=1)}_{order.id}"
+
+
+def parse_order_cursor(cursor):
+    microseconds, order_id = cursor.split("_")
+    return ORDER_CURSOR_EPOCH + timedelta(microseconds=int(microseconds)), int(order_id)
 
 
 # Show orders page with pagination
 async def show_orders_page(
-    update: Update, context: ContextTypes.DEFAULT_TYPE, user, orders, page_number
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    user,
+    page_orders,
+    has_previous,
+    has_next,
 ):
-    orders_per_page = 10
-    start_index = page_number * orders_per_page
-    end_index = min(start_index + orders_per_page, len(orders))
+    # One bulk status request for the whole page keeps the emojis live
+    await refresh_order_statuses(page_orders)
 
     keyboard = [
         [
             InlineKeyboardButton(
-                f"Order ID: {order.order_id}",
+                f"{ORDER_STATUS_EMOJIS.get(order.status, '❓')} Order ID: {order.order_id}",
                 callback_data=f"view_order_{order.order_id}",
             )
         ]
-        for order in orders[start_index:end_index]
+        for order in page_orders
     ]
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    back_button = translate_text("🔙 Back", user.preferred_language)
-    custom_order_button = translate_text(
-        "🔍 Enter Custom Order ID", user.preferred_language
+    back_button, custom_order_button = await translate_many(
+        [
+            "🔙 Back",
+            "🔍 Enter Custom Order ID",
+        ],
+        user.preferred_language,
     )
     keyboard.append(
         [InlineKeyboardButton(custom_order_button, callback_data="custom_order_id")]
     )
     keyboard.append([InlineKeyboardButton(back_button, callback_data=f"back")])
-    if start_index > 0:
+    if has_previous and page_orders:
         keyboard.append(
-            [InlineKeyboardButton("⬅️ Back", callback_data="previous_orders_page")]
+            [
+                InlineKeyboardButton(
+                    "⬅️ Back",
+                    callback_data=f"orders_before_{order_cursor(page_orders[0])}",
+                )
+            ]
         )
-    if end_index < len(orders):
+    if has_next and page_orders:
         keyboard.append(
-            [InlineKeyboardButton("➡️ Next", callback_data="next_orders_page")]
+            [
+                InlineKeyboardButton(
+                    "➡️ Next",
+                    callback_data=f"orders_after_{order_cursor(page_orders[-1])}",
+                )
+            ]
         )
-    back_button = translate_text("🔙 Back", user.preferred_language)
 
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     await update.callback_query.edit_message_text(
-        translate_text("📦 Your Orders:", user.preferred_language),
+        await translate("📦 Your Orders:", user.preferred_language),
         reply_markup=reply_markup,
     )
 
 
-# Handle pagination for orders
+# Handle pagination for orders; the cursor in the button is the order the page
+# continues from, so only one page of rows is read
 async def handle_order_pagination(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    user = context.profile
 
-    orders = (
-        session.query(Order)
-        .filter_by(user_id=user.id)
-        .order_by(Order.timestamp.desc())
-        .all()
-    )
+    _, direction, cursor = query.data.split("_", 2)
+    key = parse_order_cursor(cursor)
 
-    if query.data == "next_orders_page":
-        context.user_data["current_page"] += 1
-    elif query.data == "previous_orders_page":
-        context.user_data["current_page"] -= 1
-
-    await show_orders_page(
-        update, context, user, orders, context.user_data["current_page"]
-    )
-    session.close()
+    if direction == "after":
+        orders, more = await get_user_orders_page(
+            context.session, user.id, ORDERS_PAGE_SIZE, after=key
+        )
+        await show_orders_page(update, context, user, orders, has_previous=True, has_next=more)
+    else:
+        orders, more = await get_user_orders_page(
+            context.session, user.id, ORDERS_PAGE_SIZE, before=key
+        )
+        await show_orders_page(update, context, user, orders, has_previous=more, has_next=True)
 
 
 # Handle viewing the details of an individual order
 async def handle_individual_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
+    session = context.session
+    user = context.profile
 
     order_id = query.data.split("_")[2]
-    order = session.query(Order).filter_by(order_id=order_id, user_id=user.id).first()
+    order = await get_order(session, order_id, user_id=user.id)
 
     if order:
         # Fetching order status and details
-        response = requests.post(
-            API_URL, data={"key": API_KEY, "action": "status", "order": order_id}
-        )
-        order_status = response.json()
+        try:
+            order_status = await fetch_order_status(order_id, order)
+        except ProviderError as e:
+            print(f"Failed to fetch order status: {e}")
+            await query.edit_message_text(
+                await translate(
+                    "❌ Could not fetch the order status. Please try again later. ❌",
+                    user.preferred_language,
+                ),
+                reply_markup=InlineKeyboardMarkup(
+                    [[InlineKeyboardButton("🔙 Back", callback_data="view_order")]]
+                ),
+            )
+            return
 
-        start_count = int(float(order_status.get("start_count") or 0))
-        remains = float(order_status.get("remains", 0))
-        charge = float(order_status.get("charge", 0))
+        start_count = order_status.start_count
+        remains = order_status.remains
+        charge = order_status.charge
         
         # Convert charge to Dollar
-        dollar_to_toman_rate = await get_dollar_to_toman_rate()
+        dollar_to_toman_rate = settings_store.dollar_to_toman_rate
         charge_dollar = charge / dollar_to_toman_rate
 
         total_count = start_count + order.quantity
@@ -2362,30 +2791,30 @@ async def handle_individual_order(update: Update, context: ContextTypes.DEFAULT_
         )
         progress_message = f"{battery_status} {percentage_complete}%"
 
-        status_mapping = {
-            "Pending": "🟡",
-            "In Progress": "🔵",
-            "Completed": "🟢",
-            "Canceled": "🔴",
-        }
-
-        status = order_status.get("status", "Unknown")
-        status_emoji = status_mapping.get(status, "❓")
-
-        status_message = (
-        
-        f"🔍 **Order Status:**\n\n"
-        f"**Order id:** `{order_id}` 📄\n"
-        f"💵 **Order cost:** {charge:,.0f} Toman ({charge_dollar:,.2f} $)\n"  # Formatted values
-        f"📊 **Start Count:** {start_count}\n"
-        f"{progress_message}\n"
-        f"⏳ **Remains:** {remains} pcs\n"
-        f"{status_emoji} **Status:** {status}\n"
-        f"💸 **Currency:** {order_status.get('currency', 'N/A')}"
+        status = order_status.status
+        status_emoji = ORDER_STATUS_EMOJIS.get(status, "❓")
+
+        translated_message = await translate_template(
+            "🔍 **Order Status:**\n\n"
+            "**Order id:** `{order_id}` 📄\n"
+            "💵 **Order cost:** {charge:,.0f} Toman ({charge_dollar:,.2f} $)\n"
+            "📊 **Start Count:** {start_count}\n"
+            "{progress_message}\n"
+            "⏳ **Remains:** {remains} pcs\n"
+            "{status_emoji} **Status:** {status}\n"
+            "💸 **Currency:** {currency}",
+            user.preferred_language,
+            order_id=str(order_id),
+            charge=charge,
+            charge_dollar=charge_dollar,
+            start_count=start_count,
+            progress_message=progress_message,
+            remains=remains,
+            status_emoji=status_emoji,
+            status=await translate(status, user.preferred_language),
+            currency=order_status.currency,
         )
 
-        translated_message = translate_text(status_message, user.preferred_language)
-
         keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="view_order")]]
 
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -2393,7 +2822,6 @@ async def handle_individual_order(update: Update, context: ContextTypes.DEFAULT_
         await query.edit_message_text(
             translated_message, reply_markup=reply_markup, parse_mode="Markdown"
         )
-    session.close()
 
 
 
@@ -2409,30 +2837,203 @@ async def handle_check_order_status(update: Update, context: ContextTypes.DEFAUL
 # Handle the management of unit value (conversion rate for credits)
 async def handle_manage_unit_value(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    session = Session()
-    user = session.query(User).filter_by(num_id=update.effective_user.id).first()
-    back_button = translate_text("🔙 Back", user.preferred_language)
+    user = context.profile
+    back_button = await translate("🔙 Back", user.preferred_language)
     keyboard = []
     keyboard.append([InlineKeyboardButton(back_button, callback_data="back")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
-        translate_text(
-            "💲 Please enter the unit value in dollars (e.g., 0.1): 💰",
+        await translate(
+            "💲 Please enter the unit value in dollars (e.g., 0.1), or a unit name and value for a pricing tier (e.g., agency 0.08): 💰",
             user.preferred_language,
         ),
         reply_markup=reply_markup,
     )
     context.user_data["awaiting_unit_value"] = True
-    session.close()
+
+
+# Admin command to report cache and performance counters
+async def handle_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = context.profile
+
+    if user and user.is_admin:
+        translation_stats = translation_cache.stats()
+        status_stats = order_status_cache.stats()
+        provider_stats = provider.stats()
+        profile_stats = user_profile_cache.stats()
+        summary = await get_admin_summary(context.session)
+        open_orders = await count_open_orders(context.session)
+        stats_text = (
+            f"📈 Translation cache:\n"
+            f"• Memory hits: {translation_stats['hits']}\n"
+            f"• SQLite hits: {translation_stats['persistent_hits']}\n"
+            f"• Misses: {translation_stats['misses']}\n"
+            f"• Evictions: {translation_stats['evictions']}\n"
+            f"• Size: {translation_stats['size']}\n"
+            f"• Hit rate: {translation_stats['hit_rate']:.1%}\n\n"
+            f"📦 Order status cache:\n"
+            f"• Hits: {status_stats['hits']}\n"
+            f"• Coalesced: {status_stats['coalesced']}\n"
+            f"• Misses: {status_stats['misses']}\n"
+            f"• Stale hits: {status_stats['stale_hits']}\n"
+            f"• Evictions: {status_stats['evictions']}\n"
+            f"• Size: {status_stats['size']}\n"
+            f"• Hit rate: {status_stats['hit_rate']:.1%}\n\n"
+            f"🔌 Provider API:\n"
+            f"• Circuit breaker: {provider_stats['breaker_state']}\n"
+            f"• Consecutive failures: {provider_stats['consecutive_failures']}\n"
+            f"• Times opened: {provider_stats['times_opened']}\n"
+            f"• Requests: {provider_stats['requests']}\n"
+            f"• Failed requests: {provider_stats['failures']}\n"
+            f"• Retries: {provider_stats['retries']}\n"
+            f"• Rejected while open: {provider_stats['rejected']}\n\n"
+            f"👤 User profile cache:\n"
+            f"• Hits: {profile_stats['hits']}\n"
+            f"• Misses: {profile_stats['misses']}\n"
+            f"• Expired: {profile_stats['expired']}\n"
+            f"• Evictions: {profile_stats['evictions']}\n"
+            f"• Size: {profile_stats['size']}\n"
+            f"• Hit rate: {profile_stats['hit_rate']:.1%}\n\n"
+            f"🗂 Waiting for admins:\n"
+            f"• Pending agency requests: {summary.pending_agency_requests}\n"
+            f"• Open tickets: {summary.open_tickets}\n"
+            f"• Open orders: {open_orders}"
+        )
+        await update.message.reply_text(stats_text)
+
+
+# Admin command to reload the message catalog; prebuilt menus are rebuilt on next use
+async def handle_reload_catalog(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = context.profile
+
+    if user and user.is_admin:
+        message_catalog.load()
+        await update.message.reply_text(
+            f"✅ Message catalog reloaded (version {message_catalog.version})."
+        )
+
+
+# Admin command to drop the cached provider catalog and download it again
+async def handle_refresh_services(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = context.profile
+
+    if user and user.is_admin:
+        service_catalog.invalidate()
+        try:
+            refreshed = await service_catalog.refresh()
+        except ServiceCatalogUnavailable:
+            refreshed = False
+        if not refreshed:
+            await update.message.reply_text(
+                "❌ Service catalog refresh failed; see the log."
+                + (" The previous catalog is still served." if service_catalog.index else "")
+            )
+            return
+        await update.message.reply_text(
+            f"✅ Service catalog refreshed ({len(service_catalog.index.services)} services)."
+        )
+
+
+# Admin command listing the checkouts whose placement couldn't be confirmed
+async def handle_unconfirmed_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if current_admin(context):
+        queued_orders = await get_unconfirmed_queued_orders(context.session)
+        if not queued_orders:
+            await update.message.reply_text("✅ No unconfirmed orders.")
+            return
+        await update.message.reply_text(
+            "⚠️ Unconfirmed orders:\n\n"
+            + "\n".join(unconfirmed_order_line(queued_order) for queued_order in queued_orders)
+        )
+
+
+# Admin command settling an unconfirmed checkout after checking the provider
+# panel: "/resolve_order <id> <provider order id>" records the order and
+# "/resolve_order <id> refund" gives the user their credit back
+async def handle_resolve_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not current_admin(context):
+        return
+
+    session = context.session
+    args = context.args or []
+    if len(args) != 2 or not args[0].isdigit() or not (args[1].isdigit() or args[1] == "refund"):
+        await update.message.reply_text(
+            "Usage: /resolve_order <id> <provider order id> or /resolve_order <id> refund"
+        )
+        return
+
+    queued_order = await get_queued_order(session, int(args[0]))
+    if queued_order is None or queued_order.status != "unconfirmed":
+        await update.message.reply_text(f"❌ #{args[0]} is not an unconfirmed order.")
+        return
+
+    user = await get_user_by_id(session, queued_order.user_id)
+    if args[1] == "refund":
+        queued_order.status = "failed"
+        await refund_user_credit(session, user, queued_order.cost)
+        await session.commit()
+        user_text = await translate_template(
+            "❌ There was an issue placing your order. {cost:.2f} credits have been refunded to your account. ❌",
+            user.preferred_language,
+            cost=queued_order.cost,
+        )
+    else:
+        order_id = int(args[1])
+        queued_order.status = "placed"
+        queued_order.order_id = order_id
+        if await get_order(session, order_id) is None:
+            session.add(
+                placed_order(queued_order, order_id)
+            )
+        await session.commit()
+        user_text = await translate_template(
+            "🛒 Order registered successfully!\n\n**Order ID:** `{order_id}` 📄",
+            user.preferred_language,
+            order_id=str(order_id),
+        )
+
+    await update.message.reply_text(f"✅ #{queued_order.id} settled.")
+    try:
+        await context.bot.send_message(
+            chat_id=user.num_id, text=user_text, parse_mode="Markdown"
+        )
+    except Exception as e:
+        print(f"Failed to notify user {user.num_id} about queued order {queued_order.id}: {e}")
+
+
+# Prepare the database and build the shared menus once the application starts
+async def on_startup(application):
+    await init_database()
+    await keyboard_registry.build()
+    await load_settings()
+    await start_order_workers(application.bot)
+
+
+async def on_shutdown(application):
+    for worker in order_workers:
+        worker.cancel()
+    await provider.close()
+    await engine.dispose()
 
 
 # The main function that sets up the Telegram bot and all the handlers
 def main():
-    application = ApplicationBuilder().token(TOKEN).build()
+    application = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
     application.add_handler(
         MessageHandler(filters.TEXT & ~filters.COMMAND, handle_all_messages)
     )
     application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("stats", handle_stats))
+    application.add_handler(CommandHandler("reload_catalog", handle_reload_catalog))
+    application.add_handler(CommandHandler("refresh_services", handle_refresh_services))
+    application.add_handler(CommandHandler("unconfirmed_orders", handle_unconfirmed_orders))
+    application.add_handler(CommandHandler("resolve_order", handle_resolve_order))
     application.add_handler(
         CallbackQueryHandler(
             handle_language_selection, pattern="^(" + "|".join(languages.keys()) + ")$"
@@ -2446,7 +3047,8 @@ def main():
     )
     application.add_handler(
         CallbackQueryHandler(
-            handle_view_agency_requests, pattern="^view_agency_requests$"
+            handle_view_agency_requests,
+            pattern=r"^view_agency_requests(_(after|before)_\d+)?$",
         )
     )
     application.add_handler(
@@ -2466,7 +3068,9 @@ def main():
         CallbackQueryHandler(handle_create_ticket, pattern="^create_ticket$")
     )
     application.add_handler(
-        CallbackQueryHandler(handle_view_tickets, pattern="^view_tickets$")
+        CallbackQueryHandler(
+            handle_view_tickets, pattern=r"^view_tickets(_(after|before)_\d+)?$"
+        )
     )
     application.add_handler(
         CallbackQueryHandler(handle_view_ticket, pattern=r"^view_ticket_\d+$")
@@ -2527,6 +3131,9 @@ def main():
     application.add_handler(
         CallbackQueryHandler(handle_service_selection, pattern=r"^service_.+$")
     )
+    application.add_handler(
+        CallbackQueryHandler(handle_mass_order, pattern="^mass_order$")
+    )
     application.add_handler(
         CallbackQueryHandler(handle_custom_increment, pattern="^custom_increment$")
     )
@@ -2536,7 +3143,7 @@ def main():
     application.add_handler(
         CallbackQueryHandler(
             handle_order_pagination,
-            pattern=r"^(next_orders_page|previous_orders_page)$",
+            pattern=r"^orders_(after|before)_\d+_\d+$",
         )
     )
     application.add_handler(
@@ -2559,6 +3166,21 @@ def main():
         CallbackQueryHandler(handle_ticket_response, pattern="^reply_ticket$")
     )
 
+    # One session and one user load per update, committed once after the handler
+    install_unit_of_work(application)
+
+    application.job_queue.run_repeating(
+        refresh_service_catalog, interval=SERVICE_CATALOG_REFRESH_INTERVAL, first=0
+    )
+    application.job_queue.run_repeating(
+        poll_order_statuses, interval=ORDER_POLL_INTERVAL, first=ORDER_POLL_INTERVAL
+    )
+    application.job_queue.run_repeating(
+        checkpoint_database,
+        interval=SQLITE_CHECKPOINT_INTERVAL,
+        first=SQLITE_CHECKPOINT_INTERVAL,
+    )
+
     application.run_polling()
 
 
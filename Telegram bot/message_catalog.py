@@ -0,0 +1,44 @@
+import json
+import os
+import threading
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+TEMPLATE_FILE = "messages.json"
+
+
+# Offline message catalog: one JSON bundle per language mapping msgid -> msgstr,
+# where the msgid is the source string used in the handlers (gettext style)
+class MessageCatalog:
+    def __init__(self, directory):
+        self.directory = directory
+        self.version = 0
+        self._bundles = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    # (Re)load every language bundle from disk and bump the catalog version
+    def load(self):
+        bundles = {}
+        if os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if not filename.endswith(".json") or filename == TEMPLATE_FILE:
+                    continue
+                with open(os.path.join(self.directory, filename), encoding="utf-8") as f:
+                    bundles[filename[: -len(".json")]] = json.load(f)
+
+        with self._lock:
+            self._bundles = bundles
+            self.version += 1
+
+    # Translated string for a msgid, or None when the catalog doesn't have it
+    def gettext(self, msgid, language):
+        bundle = self._bundles.get(language)
+        if bundle:
+            return bundle.get(msgid)
+        return None
+
+    def languages(self):
+        return list(self._bundles)
+
+
+message_catalog = MessageCatalog(LOCALES_DIR)
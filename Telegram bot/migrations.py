@@ -0,0 +1,174 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, text
+
+
+def add_column_if_missing(connection, table, column, column_type):
+    columns = {info["name"] for info in inspect(connection).get_columns(table)}
+    if column not in columns:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+
+def create_index(connection, name, table, columns, unique=False, where=None):
+    connection.execute(
+        text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+            f"ON {table} ({', '.join(columns)})"
+            + (f" WHERE {where}" if where else "")
+        )
+    )
+
+
+def add_order_provider_details(connection):
+    for column, column_type in [
+        ("charge", "FLOAT"),
+        ("start_count", "INTEGER"),
+        ("remains", "FLOAT"),
+        ("currency", "VARCHAR"),
+    ]:
+        add_column_if_missing(connection, "orders", column, column_type)
+
+
+# Tables whose user_id column points at users.id
+USER_OWNED_TABLES = ["orders", "order_queue", "tickets", "agency_requests"]
+
+# Balances added up when duplicate users are merged
+USER_BALANCE_COLUMNS = ["remaining_credit", "used_credit", "referral_credit", "sub_transaction_earnings"]
+
+
+# Older versions of /start could insert the same Telegram id twice. Fold each
+# duplicate into the oldest row (lowest id) so the unique index can be created:
+# its orders, checkouts, tickets and agency requests move over, its balances are
+# added up and it keeps admin rights if either row had them.
+def merge_duplicate_users(connection):
+    rows = connection.execute(
+        text(
+            "SELECT id, num_id FROM users WHERE num_id IN ("
+            "SELECT num_id FROM users WHERE num_id IS NOT NULL "
+            "GROUP BY num_id HAVING COUNT(*) > 1) "
+            "ORDER BY num_id, id"
+        )
+    ).all()
+
+    kept = {}
+    for user_id, num_id in rows:
+        if num_id not in kept:
+            kept[num_id] = user_id
+            continue
+
+        ids = {"kept": kept[num_id], "duplicate": user_id}
+        for table in USER_OWNED_TABLES:
+            connection.execute(
+                text(f"UPDATE {table} SET user_id = :kept WHERE user_id = :duplicate"), ids
+            )
+        balances = ", ".join(
+            f"{column} = COALESCE({column}, 0) + "
+            f"(SELECT COALESCE({column}, 0) FROM users WHERE id = :duplicate)"
+            for column in USER_BALANCE_COLUMNS
+        )
+        connection.execute(
+            text(
+                f"UPDATE users SET {balances}, is_admin = MAX(COALESCE(is_admin, 0), "
+                "(SELECT COALESCE(is_admin, 0) FROM users WHERE id = :duplicate)) "
+                "WHERE id = :kept"
+            ),
+            ids,
+        )
+        connection.execute(text("DELETE FROM users WHERE id = :duplicate"), ids)
+        print(f"Merged duplicate user {user_id} into user {kept[num_id]} (Telegram id {num_id})")
+
+
+# Index names match the ones create_all gives the models, so fresh and migrated
+# databases end up with the same schema. Duplicates are merged first; databases
+# that already applied this migration had none, so it is never run again for them.
+def add_lookup_indexes(connection):
+    merge_duplicate_users(connection)
+    create_index(connection, "ix_users_num_id", "users", ["num_id"], unique=True)
+    create_index(connection, "ix_orders_user_id_timestamp", "orders", ["user_id", "timestamp"])
+    create_index(connection, "ix_tickets_status", "tickets", ["status"])
+    create_index(connection, "ix_agency_requests_status", "agency_requests", ["status"])
+
+
+# Order history pages seek on (user_id, timestamp, id); the new index covers every
+# lookup the old (user_id, timestamp) one served
+def add_order_history_keyset_index(connection):
+    create_index(
+        connection, "ix_orders_user_id_timestamp_id", "orders", ["user_id", "timestamp", "id"]
+    )
+    connection.execute(text("DROP INDEX IF EXISTS ix_orders_user_id_timestamp"))
+
+
+# The status poller reads the open orders that are due. Existing open orders are
+# due straight away; the partial index only holds open orders, so its size follows
+# the poller's work rather than the order history.
+def add_order_next_poll_at(connection):
+    add_column_if_missing(connection, "orders", "next_poll_at", "DATETIME")
+    connection.execute(
+        text("UPDATE orders SET next_poll_at = :now WHERE next_poll_at IS NULL"),
+        {"now": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")},
+    )
+    create_index(
+        connection,
+        "ix_orders_open_next_poll_at",
+        "orders",
+        ["next_poll_at"],
+        where="status NOT IN ('Completed', 'Partial', 'Canceled')",
+    )
+
+
+# Ordered schema changes as (version, description, function(connection)). Never
+# edit or renumber an applied migration; append a new one instead.
+MIGRATIONS = [
+    (1, "Add provider details to orders", add_order_provider_details),
+    (2, "Index user, order, ticket and agency request lookups", add_lookup_indexes),
+    (3, "Index order history on (user_id, timestamp, id)", add_order_history_keyset_index),
+    (4, "Schedule and index status polls of open orders", add_order_next_poll_at),
+]
+
+
+# Apply every migration newer than the database, each in its own transaction.
+# Takes a connection so it also runs under AsyncConnection.run_sync.
+def run_migrations(connection):
+    connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "description TEXT NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL)"
+        )
+    )
+    applied = {
+        row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))
+    }
+    connection.commit()
+
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            migrate(connection)
+            connection.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, description, applied_at) "
+                    "VALUES (:version, :description, :applied_at)"
+                ),
+                {
+                    "version": version,
+                    "description": description,
+                    "applied_at": datetime.now(timezone.utc),
+                },
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        print(f"Applied migration {version}: {description}")
+
+
+# Highest applied migration version, or 0 for an unmigrated database
+def schema_version(connection):
+    if not inspect(connection).has_table("schema_migrations"):
+        return 0
+    return connection.execute(
+        text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    ).scalar()
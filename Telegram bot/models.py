@@ -0,0 +1,130 @@
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import Column, Index, Integer, Float, String, Boolean, DateTime, bindparam
+from sqlalchemy.orm import declarative_base
+
+# Setting up SQLAlchemy ORM base class
+Base = declarative_base()
+
+
+# User model for storing user details
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True)
+    username = Column(String)
+    first_name = Column(String)
+    last_name = Column(Integer)
+    num_id = Column(Integer, unique=True, index=True)
+    profile_url = Column(String)
+    preferred_language = Column(String)
+    is_premium = Column(Boolean)
+    is_bot = Column(Boolean)
+    is_admin = Column(Boolean, default=False)
+    join_date = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    used_credit = Column(Integer, default=0)
+    remaining_credit = Column(Integer, default=1)
+    referral_credit = Column(Integer, default=0)
+    sub_transaction_earnings = Column(Integer, default=0)
+    last_chance_time = Column(DateTime, default=lambda: datetime.now(timezone.utc) - timedelta(days=1))
+    last_ticket_time = Column(DateTime, default=lambda: datetime.now(timezone.utc) - timedelta(minutes=10))
+    referrer_id = Column(Integer, nullable=True)
+
+
+# AgencyRequest model for handling agency requests
+class AgencyRequest(Base):
+    __tablename__ = "agency_requests"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer)
+    daily_sales = Column(String)
+    status = Column(String, default="pending", index=True)
+
+
+# Ticket model for storing support tickets
+class Ticket(Base):
+    __tablename__ = "tickets"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer)
+    title = Column(String)
+    description = Column(String)
+    status = Column(String, default="open", index=True)
+
+
+# DiscountCode model for storing discount codes
+class DiscountCode(Base):
+    __tablename__ = "discount_codes"
+    id = Column(Integer, primary_key=True)
+    code = Column(String, unique=True, nullable=False)
+    discount_percent = Column(Integer, nullable=False)
+
+
+# ConversionRate model for storing conversion rates
+class ConversionRate(Base):
+    __tablename__ = "conversion_rate"
+    id = Column(Integer, primary_key=True)
+    rate = Column(Integer, nullable=False, default=60000)
+
+
+# Unit model for storing unit values
+class Unit(Base):
+    __tablename__ = "units"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    value = Column(Integer, nullable=False)  # Default value set to 1
+
+
+# Provider statuses after which an order no longer changes
+FINAL_ORDER_STATUSES = ("Completed", "Partial", "Canceled")
+
+
+# Order model for storing orders
+class Order(Base):
+    __tablename__ = "orders"
+    # Order history pages are keyed on (timestamp, id) within one user's orders
+    __table_args__ = (
+        Index("ix_orders_user_id_timestamp_id", "user_id", "timestamp", "id"),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer)
+    order_id = Column(Integer, unique=True, nullable=False)
+    service_id = Column(String)
+    link = Column(String)
+    quantity = Column(Integer)
+    status = Column(String, default="Pending")
+    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Last details reported by the provider, so final orders need no API call
+    charge = Column(Float, nullable=True)
+    start_count = Column(Integer, nullable=True)
+    remains = Column(Float, nullable=True)
+    currency = Column(String, nullable=True)
+    # When the status poller should next ask the provider about this order
+    next_poll_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+# Condition for orders that haven't reached a final status. The statuses are
+# rendered as literals: SQLite only uses a partial index when a query repeats
+# the index's condition literally, not through bound parameters.
+ORDER_IS_OPEN = Order.status.notin_(
+    bindparam("final_order_statuses", FINAL_ORDER_STATUSES, expanding=True, literal_execute=True)
+)
+
+# Only open orders are polled, so only they are indexed by next poll time
+Index("ix_orders_open_next_poll_at", Order.next_poll_at, sqlite_where=ORDER_IS_OPEN)
+
+
+# Checkout waiting to be sent to the provider. Credit is deducted when the row is
+# queued and refunded if the provider rejects the order. When the provider may or
+# may not have created the order (a timeout after sending it, a restart mid-call)
+# the row is "unconfirmed" until an admin settles it with /resolve_order.
+class QueuedOrder(Base):
+    __tablename__ = "order_queue"
+    id = Column(Integer, primary_key=True)
+    idempotency_key = Column(String, unique=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    service_id = Column(String)
+    link = Column(String)
+    quantity = Column(Integer)
+    cost = Column(Float)
+    status = Column(String, default="queued")  # queued, processing, placed, failed or unconfirmed
+    order_id = Column(Integer, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
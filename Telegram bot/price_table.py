@@ -0,0 +1,67 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+from service_catalog import service_catalog
+from settings_store import DEFAULT_UNIT, settings_store
+
+# Price of 1000 items of a service in credits, toman and dollars
+ServicePrice = namedtuple("ServicePrice", ["credits_per_1000", "toman_per_1000", "dollars_per_1000"])
+
+
+# Per-service prices precomputed from the catalog, the dollar rate and the default
+# unit value. Rebuilt when the catalog refreshes or an admin changes a rate, so
+# order screens only do lookups.
+class PriceTable:
+    def __init__(self):
+        self.settings = settings_store.current
+        self.catalog_version = None
+        self._catalog = None
+        self._prices = MappingProxyType({})
+
+    # Reprice the current catalog after the rate or unit settings changed
+    def reprice(self, settings):
+        self.settings = settings
+        if self._catalog is not None:
+            self.rebuild(self._catalog)
+
+    def rebuild(self, catalog):
+        rate = self.settings.dollar_to_toman_rate
+        unit_value_cents = self.settings.units.get(DEFAULT_UNIT)
+        prices = {}
+        if rate and unit_value_cents:
+            credits_per_dollar = 100 / unit_value_cents
+            for service_id, service in catalog.by_id.items():
+                toman_per_1000 = float(service["rate"])
+                dollars_per_1000 = toman_per_1000 / rate
+                prices[service_id] = ServicePrice(
+                    dollars_per_1000 * credits_per_dollar, toman_per_1000, dollars_per_1000
+                )
+        self._prices = MappingProxyType(prices)
+        self._catalog = catalog
+        self.catalog_version = catalog.version
+
+    # Price of a service, or None if it's unknown or no unit value is set
+    def get(self, catalog, service_id):
+        if catalog.version != self.catalog_version:
+            self.rebuild(catalog)
+        return self._prices.get(str(service_id))
+
+    def credits_to_dollars(self, credits):
+        return credits * self.settings.units[DEFAULT_UNIT] / 100
+
+    def credits_to_toman(self, credits):
+        return self.credits_to_dollars(credits) * self.settings.dollar_to_toman_rate
+
+
+def order_cost(price, quantity):
+    return price.credits_per_1000 * quantity / 1000
+
+
+# Largest quantity of a service a balance of `credits` can pay for
+def max_orderable_quantity(price, credits):
+    return int(credits * 1000 / price.credits_per_1000) if price.credits_per_1000 else 0
+
+
+price_table = PriceTable()
+service_catalog.add_listener(price_table.rebuild)
+settings_store.add_listener(price_table.reprice)
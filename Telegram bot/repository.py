@@ -0,0 +1,277 @@
+from collections import namedtuple
+
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import (
+    ORDER_IS_OPEN,
+    AgencyRequest,
+    ConversionRate,
+    DiscountCode,
+    Order,
+    QueuedOrder,
+    Ticket,
+    Unit,
+    User,
+)
+
+# Counts of the work waiting for admins
+AdminSummary = namedtuple("AdminSummary", ["pending_agency_requests", "open_tickets"])
+
+
+# First row of a model matching the given column values, or None
+async def first(session, model, **criteria):
+    return await session.scalar(select(model).filter_by(**criteria).limit(1))
+
+
+# Every row of a model matching the given column values
+async def all_rows(session, model, **criteria):
+    return (await session.scalars(select(model).filter_by(**criteria))).all()
+
+
+# User by Telegram id
+async def get_user(session, num_id):
+    return await first(session, User, num_id=num_id)
+
+
+# User by Telegram id, only if they are an admin
+async def get_admin(session, num_id):
+    return await first(session, User, num_id=num_id, is_admin=True)
+
+
+# User by primary key
+async def get_user_by_id(session, user_id):
+    return await session.get(User, user_id)
+
+
+async def get_users_by_ids(session, user_ids):
+    return (await session.scalars(select(User).where(User.id.in_(user_ids)))).all()
+
+
+async def get_users(session, **criteria):
+    return await all_rows(session, User, **criteria)
+
+
+# Add `remaining` and `used` to a user's credit columns inside the UPDATE, so
+# credit that other sessions committed since the row was loaded (queue workers,
+# other checkouts) isn't overwritten. Extra `criteria` make the update
+# conditional. The loaded row gets the new balances; False if no row matched.
+async def _change_user_credit(session, user, remaining, used, *criteria):
+    row = (
+        await session.execute(
+            update(User)
+            .where(User.id == user.id, *criteria)
+            .values(
+                remaining_credit=User.remaining_credit + remaining,
+                used_credit=User.used_credit + used,
+            )
+            .returning(User.remaining_credit, User.used_credit)
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+    if row is None:
+        return False
+    set_committed_value(user, "remaining_credit", row.remaining_credit)
+    set_committed_value(user, "used_credit", row.used_credit)
+    return True
+
+
+# Give a user credit (top-ups, rewards, referral bonuses)
+async def add_user_credit(session, user, amount):
+    return await _change_user_credit(session, user, amount, 0)
+
+
+# Move `cost` from a user's remaining to their used credit, only if the balance
+# covers it at the time of the UPDATE; False if it doesn't
+async def charge_user_credit(session, user, cost):
+    return await _change_user_credit(session, user, -cost, cost, User.remaining_credit >= cost)
+
+
+# Give back credit charged for a checkout that was never placed
+async def refund_user_credit(session, user, amount):
+    return await _change_user_credit(session, user, amount, -amount)
+
+
+# One page of a select ordered by an id column, oldest first: the rows after the
+# `after` id, or the page ending just before the `before` id. Returns (rows, more)
+# like get_user_orders_page.
+async def id_page(session, statement, key, page_size, after=None, before=None):
+    if before is not None:
+        statement = statement.where(key < before).order_by(key.desc())
+    else:
+        if after is not None:
+            statement = statement.where(key > after)
+        statement = statement.order_by(key)
+
+    rows = list(await session.execute(statement.limit(page_size + 1)))
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before is not None:
+        rows.reverse()
+    return rows, more
+
+
+# (request, user) for an agency request, joined in one query; (None, None) if missing
+async def get_agency_request_with_user(session, request_id):
+    row = (
+        await session.execute(
+            select(AgencyRequest, User)
+            .outerjoin(User, User.id == AgencyRequest.user_id)
+            .where(AgencyRequest.id == request_id)
+        )
+    ).first()
+    return tuple(row) if row else (None, None)
+
+
+# A page of pending agency requests as (request, user) rows
+async def get_pending_agency_requests_page(session, page_size, after=None, before=None):
+    statement = (
+        select(AgencyRequest, User)
+        .outerjoin(User, User.id == AgencyRequest.user_id)
+        .where(AgencyRequest.status == "pending")
+    )
+    return await id_page(session, statement, AgencyRequest.id, page_size, after, before)
+
+
+# (ticket, user) for a ticket, joined in one query; (None, None) if missing
+async def get_ticket_with_user(session, ticket_id):
+    row = (
+        await session.execute(
+            select(Ticket, User)
+            .outerjoin(User, User.id == Ticket.user_id)
+            .where(Ticket.id == ticket_id)
+        )
+    ).first()
+    return tuple(row) if row else (None, None)
+
+
+# A page of open tickets
+async def get_open_tickets_page(session, page_size, after=None, before=None):
+    statement = select(Ticket).where(Ticket.status == "open")
+    rows, more = await id_page(session, statement, Ticket.id, page_size, after, before)
+    return [ticket for ticket, in rows], more
+
+
+# Pending agency requests and open tickets counted in one query; both are
+# served by the status indexes
+async def get_admin_summary(session):
+    def count(model, condition):
+        return select(func.count()).select_from(model).where(condition).scalar_subquery()
+
+    row = (
+        await session.execute(
+            select(
+                count(AgencyRequest, AgencyRequest.status == "pending"),
+                count(Ticket, Ticket.status == "open"),
+            )
+        )
+    ).one()
+    return AdminSummary(*row)
+
+
+# Orders that haven't reached a final status yet, for /stats; counted from the
+# partial index of open orders
+async def count_open_orders(session):
+    return await session.scalar(select(func.count()).select_from(Order).where(ORDER_IS_OPEN))
+
+
+async def get_discount_code(session, code):
+    return await first(session, DiscountCode, code=code)
+
+
+async def get_discount_codes(session):
+    return await all_rows(session, DiscountCode)
+
+
+async def get_conversion_rate(session):
+    return await first(session, ConversionRate)
+
+
+async def get_unit(session, name):
+    return await first(session, Unit, name=name)
+
+
+async def get_units(session):
+    return await all_rows(session, Unit)
+
+
+# Order by provider order id, optionally restricted to one user's orders
+async def get_order(session, order_id, user_id=None):
+    if user_id is None:
+        return await first(session, Order, order_id=order_id)
+    return await first(session, Order, order_id=order_id, user_id=user_id)
+
+
+# One page of a user's orders, newest first, keyed on (timestamp, id): pass the
+# key of the last order shown as `after` for the next page, or of the first order
+# shown as `before` for the previous one. Returns (orders, more) where `more` says
+# whether another page follows in that direction; one extra row is read to know.
+async def get_user_orders_page(session, user_id, page_size, after=None, before=None):
+    key = tuple_(Order.timestamp, Order.id)
+    statement = select(Order).filter_by(user_id=user_id)
+    if before is not None:
+        statement = statement.where(key > tuple_(*before)).order_by(
+            Order.timestamp, Order.id
+        )
+    else:
+        if after is not None:
+            statement = statement.where(key < tuple_(*after))
+        statement = statement.order_by(Order.timestamp.desc(), Order.id.desc())
+
+    orders = list(await session.scalars(statement.limit(page_size + 1)))
+    more = len(orders) > page_size
+    orders = orders[:page_size]
+    if before is not None:
+        orders.reverse()
+    return orders, more
+
+
+# Up to `limit` open orders whose next status poll is due, longest overdue first,
+# read from ix_orders_open_next_poll_at
+async def get_due_orders(session, now, limit):
+    return (
+        await session.scalars(
+            select(Order)
+            .where(ORDER_IS_OPEN, Order.next_poll_at <= now)
+            .order_by(Order.next_poll_at)
+            .limit(limit)
+        )
+    ).all()
+
+
+async def get_queued_order(session, queued_order_id):
+    return await session.get(QueuedOrder, queued_order_id)
+
+
+# Queued checkouts with the given ids that no worker has picked up yet
+async def get_waiting_queued_orders(session, queued_order_ids):
+    return (
+        await session.scalars(
+            select(QueuedOrder)
+            .where(QueuedOrder.id.in_(queued_order_ids), QueuedOrder.status == "queued")
+            .order_by(QueuedOrder.id)
+        )
+    ).all()
+
+
+# Checkouts that were queued or being placed when the bot last stopped
+async def get_unfinished_queued_orders(session):
+    return (
+        await session.scalars(
+            select(QueuedOrder).where(QueuedOrder.status.in_(["queued", "processing"]))
+        )
+    ).all()
+
+
+# Checkouts the provider may or may not have placed, waiting for an admin
+async def get_unconfirmed_queued_orders(session):
+    return await all_rows(session, QueuedOrder, status="unconfirmed")
+
+
+# True if any of the idempotency keys has already been queued
+async def idempotency_keys_exist(session, keys):
+    return (
+        await session.scalar(
+            select(QueuedOrder.id).where(QueuedOrder.idempotency_key.in_(keys)).limit(1)
+        )
+    ) is not None
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from config import SERVICE_CATALOG_TTL, SOCIAL_MEDIA_PLATFORMS
+from smm_provider import provider
+
+# Nodes of the platform -> category -> service tree
+Platform = namedtuple("Platform", ["id", "label", "categories"])
+Category = namedtuple("Category", ["id", "name", "services"])
+
+
+# Download the provider's full service list
+async def fetch_services():
+    return await provider.services()
+
+
+# Platform (label, id) a provider category belongs to, matched by the platform keyword
+def match_platform(category):
+    for platform_id, (label, platform_key) in enumerate(SOCIAL_MEDIA_PLATFORMS.items()):
+        if platform_key in category:
+            return platform_id, label
+    return None
+
+
+# Immutable snapshot of one catalog download: an id -> service map and a
+# platform -> category -> services tree. Platform ids follow SOCIAL_MEDIA_PLATFORMS
+# and category ids come from `category_ids`, so both stay stable across refreshes.
+# Every user shares the same snapshot and only keeps ids into it in user_data.
+class CatalogIndex:
+    def __init__(self, services, version, category_ids):
+        self.services = tuple(services)
+        self.version = version
+        self.by_id = MappingProxyType({str(service["service"]): service for service in services})
+
+        grouped = {}
+        platform_labels = {}
+        platform_by_category = {}
+        for service in services:
+            category = service["category"]
+            if category not in platform_by_category:
+                platform_by_category[category] = match_platform(category)
+            match = platform_by_category[category]
+            if match is None:
+                continue
+
+            platform_id, label = match
+            platform_labels[platform_id] = label
+            category_id = category_ids.setdefault(category, len(category_ids))
+            grouped.setdefault(platform_id, {}).setdefault(category_id, (category, []))[1].append(service)
+
+        platforms = {}
+        categories_by_id = {}
+        for platform_id in sorted(grouped):
+            categories = {}
+            for category_id, (name, category_services) in grouped[platform_id].items():
+                category = Category(category_id, name, tuple(category_services))
+                categories[category_id] = category
+                categories_by_id[category_id] = (platform_id, category)
+            platforms[platform_id] = Platform(
+                platform_id, platform_labels[platform_id], MappingProxyType(categories)
+            )
+        self.platforms = MappingProxyType(platforms)
+        self.categories = MappingProxyType(categories_by_id)
+
+    def get_service(self, service_id):
+        return self.by_id.get(str(service_id))
+
+    def get_platform(self, platform_id):
+        return self.platforms.get(platform_id)
+
+    # (platform id, Category) for a category id, or None if it isn't in this catalog
+    def get_category(self, category_id):
+        return self.categories.get(category_id)
+
+
+# Raised while no catalog has been loaded yet because the first download failed
+class ServiceCatalogUnavailable(Exception):
+    pass
+
+
+# Process-wide cache of the provider's service catalog. Stale data keeps being
+# served while a refresh runs; only the very first load makes a caller wait.
+class ServiceCatalog:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.index = None
+        self.fetched_at = 0
+        self.version = 0
+        self._category_ids = {}
+        self._refresh_task = None
+        self._listeners = []
+
+    def is_stale(self):
+        return time.monotonic() - self.fetched_at >= self.ttl
+
+    # Current catalog index, refreshing in the background once it goes stale;
+    # ServiceCatalogUnavailable if none could be loaded yet
+    async def get(self):
+        if self.index is None:
+            await self.refresh()
+        elif self.is_stale():
+            self.refresh_in_background()
+        return self.index
+
+    # Start a refresh unless one is already running, and return its task
+    def refresh_in_background(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh())
+        return self._refresh_task
+
+    # True if a new catalog was loaded, False if the download failed and the
+    # previous one is still served
+    async def refresh(self):
+        return await self.refresh_in_background()
+
+    async def _refresh(self):
+        try:
+            services = await fetch_services()
+            index = await asyncio.to_thread(
+                CatalogIndex, services, self.version + 1, self._category_ids
+            )
+        except Exception as e:
+            print(f"Failed to refresh service catalog: {e}")
+            if self.index is None:
+                raise ServiceCatalogUnavailable(str(e)) from e
+            return False
+
+        self.index = index
+        self.fetched_at = time.monotonic()
+        self.version = index.version
+        for listener in self._listeners:
+            listener(index)
+        return True
+
+    # Call `listener(index)` after every successful refresh
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    # Mark the cached catalog as stale so the next read triggers a refresh
+    def invalidate(self):
+        self.fetched_at = 0
+
+
+service_catalog = ServiceCatalog(SERVICE_CATALOG_TTL)
+
+
+# JobQueue callback that keeps the catalog warm off the interactive path
+async def refresh_service_catalog(context):
+    try:
+        await service_catalog.refresh()
+    except ServiceCatalogUnavailable:
+        # Already logged; the next run or the next read tries again
+        pass
@@ -0,0 +1,65 @@
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+# Name of the unit used for regular credit pricing; other named units act as
+# pricing tiers with their own dollar value per credit
+DEFAULT_UNIT = "default"
+
+# Immutable snapshot of the admin-managed pricing settings. `units` maps a unit
+# name to its value in dollar cents.
+Settings = namedtuple("Settings", ["dollar_to_toman_rate", "units"])
+
+
+# In-memory copy of the ConversionRate and Unit tables. Loaded once at startup;
+# admin changes are written to the database first and then swapped in here as a
+# new snapshot, so readers never see a half-applied update.
+class SettingsStore:
+    def __init__(self):
+        self._settings = Settings(None, MappingProxyType({}))
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def current(self):
+        return self._settings
+
+    @property
+    def dollar_to_toman_rate(self):
+        return self._settings.dollar_to_toman_rate
+
+    # Value of a named unit in dollar cents, or None if it isn't set
+    def unit_value(self, name=DEFAULT_UNIT):
+        return self._settings.units.get(name)
+
+    def load(self, dollar_to_toman_rate, units):
+        self._replace(dollar_to_toman_rate=dollar_to_toman_rate, units=MappingProxyType(dict(units)))
+
+    def set_dollar_to_toman_rate(self, rate):
+        self._replace(dollar_to_toman_rate=rate)
+
+    def set_unit_value(self, name, value_cents):
+        self._update(
+            lambda settings: settings._replace(
+                units=MappingProxyType({**settings.units, name: value_cents})
+            )
+        )
+
+    # Call `listener(settings)` after every change
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _replace(self, **changes):
+        self._update(lambda settings: settings._replace(**changes))
+
+    # Build the next snapshot from the current one and notify the listeners, all
+    # under the lock, so concurrent changes can't drop each other or reach the
+    # listeners out of order
+    def _update(self, change):
+        with self._lock:
+            self._settings = change(self._settings)
+            for listener in self._listeners:
+                listener(self._settings)
+
+
+settings_store = SettingsStore()
@@ -0,0 +1,384 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict, namedtuple
+
+import httpx
+from config import (
+    API_KEY,
+    API_URL,
+    ORDER_STATUS_CACHE_SIZE,
+    ORDER_STATUS_CACHE_TTL,
+    PROVIDER_BREAKER_RESET_TIMEOUT,
+    PROVIDER_BREAKER_THRESHOLD,
+    PROVIDER_BULK_STATUS_SIZE,
+    PROVIDER_CONCURRENCY,
+    PROVIDER_DEFAULT_TIMEOUT,
+    PROVIDER_MAX_CONNECTIONS,
+    PROVIDER_RETRIES,
+    PROVIDER_RETRY_BACKOFF,
+    PROVIDER_TIMEOUTS,
+)
+
+# Parsed `status` response for a single order
+OrderStatus = namedtuple(
+    "OrderStatus", ["order_id", "status", "charge", "start_count", "remains", "currency"]
+)
+
+# Parsed `balance` response
+Balance = namedtuple("Balance", ["balance", "currency"])
+
+# Fields every entry of the `services` response must have
+SERVICE_FIELDS = ("service", "name", "category", "rate", "min", "max")
+
+# Actions that are safe to send again after a timeout or a server error
+IDEMPOTENT_ACTIONS = {"services", "status", "balance"}
+
+
+# Raised when the provider can't be reached or answers with an error
+class ProviderError(Exception):
+    pass
+
+
+# The provider is down, timing out or the circuit breaker is open; callers can
+# fall back to cached data
+class ProviderUnavailable(ProviderError):
+    pass
+
+
+# The request never reached the provider (circuit breaker open, connection
+# refused or timed out while connecting), so it is safe to send again
+class ProviderNotReached(ProviderUnavailable):
+    pass
+
+
+# The provider answered and refused the request: an API error payload or a 4xx
+class ProviderRejected(ProviderError):
+    pass
+
+
+# Opens after `failure_threshold` consecutive failed calls so that further calls
+# fail fast; after `reset_timeout` seconds one trial call is let through
+# (half-open) and its success closes the breaker, its failure opens it again
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.times_opened = 0
+        self.opened_at = None
+        self.trial_started_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        state = self.state
+        if state == self.HALF_OPEN:
+            # Only one trial call at a time. A trial that never reports back (its
+            # caller was cancelled) stops blocking the others after reset_timeout.
+            now = time.monotonic()
+            if self.trial_started_at is not None and now - self.trial_started_at < self.reset_timeout:
+                return False
+            self.trial_started_at = now
+            return True
+        return state == self.CLOSED
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_started_at = None
+        state = self.state
+        if state == self.HALF_OPEN or (
+            state == self.CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_order_status(order_id, payload):
+    return OrderStatus(
+        order_id=str(order_id),
+        status=payload.get("status") or "Unknown",
+        charge=_number(payload.get("charge")),
+        start_count=int(_number(payload.get("start_count"))),
+        remains=_number(payload.get("remains")),
+        currency=payload.get("currency") or "N/A",
+    )
+
+
+# Async client for the SMM panel v2 API. One pooled keep-alive connection set is
+# shared by every handler, and at most `concurrency` requests are in flight.
+# Idempotent actions are retried and a circuit breaker guards every call.
+class ProviderClient:
+    def __init__(
+        self,
+        url,
+        key,
+        max_connections,
+        concurrency,
+        timeouts,
+        default_timeout,
+        bulk_status_size,
+        retries,
+        retry_backoff,
+        breaker,
+    ):
+        self.url = url
+        self.key = key
+        self.max_connections = max_connections
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        self.bulk_status_size = bulk_status_size
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker
+        self.requests = 0
+        self.failures = 0
+        self.retry_count = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    # One HTTP attempt; ProviderUnavailable for failures worth retrying
+    async def _post(self, action, params):
+        self.requests += 1
+        try:
+            async with self._semaphore:
+                response = await self._get_client().post(
+                    self.url,
+                    data={"key": self.key, "action": action, **params},
+                    timeout=self.timeouts.get(action, self.default_timeout),
+                )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            if status_code < 500 and status_code != 429:
+                raise ProviderRejected(f"{action} request failed: {e!r}") from e
+            self.failures += 1
+            raise ProviderUnavailable(f"{action} request failed: {e!r}") from e
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            self.failures += 1
+            raise ProviderNotReached(f"{action} request failed: {e!r}") from e
+        except (httpx.HTTPError, ValueError) as e:
+            self.failures += 1
+            raise ProviderUnavailable(f"{action} request failed: {e!r}") from e
+
+    # POST one API action and return the decoded JSON body
+    async def request(self, action, **params):
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise ProviderNotReached(f"{action} request skipped: provider circuit is open")
+
+        attempts = 1 + (self.retries if action in IDEMPOTENT_ACTIONS else 0)
+        for attempt in range(attempts):
+            if attempt:
+                self.retry_count += 1
+                # Full jitter keeps retrying clients from hitting the provider in step
+                await asyncio.sleep(random.uniform(0, self.retry_backoff * 2 ** (attempt - 1)))
+            try:
+                payload = await self._post(action, params)
+            except ProviderUnavailable as e:
+                error = e
+                continue
+            except ProviderRejected:
+                # A 4xx still means the provider is up
+                self.breaker.record_success()
+                raise
+
+            self.breaker.record_success()
+            if isinstance(payload, dict) and payload.get("error"):
+                raise ProviderRejected(f"{action} request failed: {payload['error']}")
+            return payload
+
+        self.breaker.record_failure()
+        raise error
+
+    # Full service list, skipping malformed entries
+    async def services(self):
+        payload = await self.request("services")
+        if not isinstance(payload, list):
+            raise ProviderError("services request returned an unexpected payload")
+        return [
+            service
+            for service in payload
+            if isinstance(service, dict) and all(field in service for field in SERVICE_FIELDS)
+        ]
+
+    # Place an order and return the provider's order id. Only ProviderRejected and
+    # ProviderNotReached mean no order was created; after any other error the
+    # order may exist at the provider.
+    async def add_order(self, service_id, link, quantity):
+        payload = await self.request("add", service=service_id, link=link, quantity=quantity)
+        order_id = payload.get("order") if isinstance(payload, dict) else None
+        if not order_id:
+            raise ProviderError("add request returned no order id")
+        return order_id
+
+    async def order_status(self, order_id):
+        payload = await self.request("status", order=order_id)
+        if not isinstance(payload, dict):
+            raise ProviderError("status request returned an unexpected payload")
+        return parse_order_status(order_id, payload)
+
+    # Statuses of many orders using the multi-order `status` action, one request
+    # per `bulk_status_size` ids; returns order id -> OrderStatus for known orders
+    async def orders_status(self, order_ids):
+        order_ids = list(dict.fromkeys(str(order_id) for order_id in order_ids))
+        chunks = [
+            order_ids[start : start + self.bulk_status_size]
+            for start in range(0, len(order_ids), self.bulk_status_size)
+        ]
+        payloads = await asyncio.gather(
+            *(self.request("status", orders=",".join(chunk)) for chunk in chunks)
+        )
+
+        statuses = {}
+        for chunk, payload in zip(chunks, payloads):
+            if not isinstance(payload, dict):
+                raise ProviderError("status request returned an unexpected payload")
+            for order_id in chunk:
+                entry = payload.get(order_id)
+                if isinstance(entry, dict) and not entry.get("error"):
+                    statuses[order_id] = parse_order_status(order_id, entry)
+        return statuses
+
+    async def balance(self):
+        payload = await self.request("balance")
+        if not isinstance(payload, dict):
+            raise ProviderError("balance request returned an unexpected payload")
+        return Balance(_number(payload.get("balance")), payload.get("currency") or "N/A")
+
+    # Snapshot of the resilience counters for logging and monitoring
+    def stats(self):
+        return {
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "times_opened": self.breaker.times_opened,
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retry_count,
+            "rejected": self.rejected,
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+provider = ProviderClient(
+    API_URL,
+    API_KEY,
+    PROVIDER_MAX_CONNECTIONS,
+    PROVIDER_CONCURRENCY,
+    PROVIDER_TIMEOUTS,
+    PROVIDER_DEFAULT_TIMEOUT,
+    PROVIDER_BULK_STATUS_SIZE,
+    PROVIDER_RETRIES,
+    PROVIDER_RETRY_BACKOFF,
+    CircuitBreaker(PROVIDER_BREAKER_THRESHOLD, PROVIDER_BREAKER_RESET_TIMEOUT),
+)
+
+
+# Short-lived cache of order statuses. Concurrent lookups of the same order
+# share one in-flight request instead of each calling the provider, and an
+# expired entry is still served while the provider is unavailable.
+class OrderStatusCache:
+    def __init__(self, client, ttl, max_entries):
+        self.client = client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+
+    async def get(self, order_id):
+        key = str(order_id)
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self.client.order_status(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda task: self._resolve(key, task))
+        else:
+            self.coalesced += 1
+        try:
+            # A caller giving up must not cancel the request the others are waiting on
+            return await asyncio.shield(task)
+        except ProviderUnavailable:
+            if entry is None:
+                raise
+            self.stale_hits += 1
+            return entry[1]
+
+    def _resolve(self, key, task):
+        self._in_flight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.put([task.result()])
+
+    # Remember statuses fetched elsewhere, e.g. by a bulk request. Entries are kept
+    # in the order they were written, so the oldest go first once the cache is full.
+    def put(self, statuses):
+        now = time.monotonic()
+        for order_status in statuses:
+            self._entries[order_status.order_id] = (now, order_status)
+            self._entries.move_to_end(order_status.order_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+order_status_cache = OrderStatusCache(provider, ORDER_STATUS_CACHE_TTL, ORDER_STATUS_CACHE_SIZE)
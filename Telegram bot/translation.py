@@ -0,0 +1,347 @@
+import asyncio
+import hashlib
+import re
+import sqlite3
+import string
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from deep_translator import GoogleTranslator
+from config import (
+    TRANSLATION_CACHE_PATH,
+    TRANSLATION_CACHE_SIZE,
+    TRANSLATION_WORKERS,
+    TRANSLATION_TIMEOUT,
+)
+from message_catalog import message_catalog
+
+
+# Two-tier translation cache: a bounded in-process LRU backed by a SQLite table
+class TranslationCache:
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "text_hash TEXT NOT NULL, "
+            "target_language TEXT NOT NULL, "
+            "translated_text TEXT NOT NULL, "
+            "PRIMARY KEY (text_hash, target_language))"
+        )
+        self._db.commit()
+
+    # Cache key for a source text and target language
+    @staticmethod
+    def make_key(text, target_language):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest(), target_language
+
+    # Look up a translation in memory first, then in SQLite; None on a miss
+    def get(self, text, target_language):
+        key = self.make_key(text, target_language)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            row = self._db.execute(
+                "SELECT translated_text FROM translations "
+                "WHERE text_hash = ? AND target_language = ?",
+                key,
+            ).fetchone()
+            if row:
+                self.persistent_hits += 1
+                self._remember(key, row[0])
+                return row[0]
+
+            self.misses += 1
+            return None
+
+    # Store a fresh translation in both tiers
+    def set(self, text, target_language, translated_text):
+        key = self.make_key(text, target_language)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations "
+                "(text_hash, target_language, translated_text) VALUES (?, ?, ?)",
+                (*key, translated_text),
+            )
+            self._db.commit()
+            self._remember(key, translated_text)
+
+    def _remember(self, key, translated_text):
+        self._entries[key] = translated_text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # Snapshot of the cache counters for logging and monitoring
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.persistent_hits + self.misses
+            return {
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+            }
+
+
+translation_cache = TranslationCache(TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_SIZE)
+# Translators of the calling thread, by target language
+_translators = threading.local()
+_executor = ThreadPoolExecutor(
+    max_workers=TRANSLATION_WORKERS, thread_name_prefix="translation"
+)
+# (text, target_language) -> future shared by every caller waiting on that translation
+_in_flight = {}
+
+# Joins the strings of one batch into a single translator request
+BATCH_SEPARATOR = "\n\n⁂\n\n"
+# Google rejects requests longer than 5000 characters
+BATCH_MAX_CHARS = 4500
+
+# Native digits and separators used when formatting numbers for each language
+LOCALE_DIGITS = {
+    "fa": str.maketrans("0123456789,.", "۰۱۲۳۴۵۶۷۸۹٬٫"),
+    "ar": str.maketrans("0123456789,.", "٠١٢٣٤٥٦٧٨٩٬٫"),
+}
+MASKED_FIELD = re.compile(r"\{(\d+)\}")
+
+
+# Reuse one translator per thread and target language. GoogleTranslator keeps the
+# text of the request in progress on the instance, so pool threads can't share one.
+def _get_translator(target_language):
+    translators = getattr(_translators, "by_language", None)
+    if translators is None:
+        translators = _translators.by_language = {}
+    translator = translators.get(target_language)
+    if translator is None:
+        translator = GoogleTranslator(source="auto", target=target_language)
+        translators[target_language] = translator
+    return translator
+
+
+# Call the translator and remember the result in the cache
+def _fetch_translation(text, target_language):
+    translated = _get_translator(target_language).translate(text)
+    if translated:
+        translation_cache.set(text, target_language, translated)
+        return translated
+    return text
+
+
+# Machine translation behind the two-tier cache; used for strings missing from the catalog
+def machine_translate(text, target_language):
+    cached = translation_cache.get(text, target_language)
+    if cached is not None:
+        return cached
+    return _fetch_translation(text, target_language)
+
+
+# Translation without any network call: catalog first, then the two-tier cache
+def lookup_translation(text, target_language):
+    translated = message_catalog.gettext(text, target_language)
+    if translated is not None:
+        return translated
+    return translation_cache.get(text, target_language)
+
+
+# Split texts into chunks that fit in one translator request
+def _chunk_batch(texts):
+    chunk = []
+    size = 0
+    for text in texts:
+        if chunk and size + len(text) + len(BATCH_SEPARATOR) > BATCH_MAX_CHARS:
+            yield chunk
+            chunk = []
+            size = 0
+        chunk.append(text)
+        size += len(text) + len(BATCH_SEPARATOR)
+    if chunk:
+        yield chunk
+
+
+# Runs on the thread pool: translate a batch of strings with as few requests as possible
+def _translate_batch(texts, target_language):
+    results = {}
+    for chunk in _chunk_batch(texts):
+        translated_chunk = None
+        if len(chunk) > 1:
+            joined = _get_translator(target_language).translate(BATCH_SEPARATOR.join(chunk))
+            parts = [part.strip() for part in (joined or "").split("⁂")]
+            if len(parts) == len(chunk) and all(parts):
+                translated_chunk = parts
+                for text, translated in zip(chunk, parts):
+                    translation_cache.set(text, target_language, translated)
+
+        # Fall back to one request per string if the separator didn't survive
+        if translated_chunk is None:
+            translated_chunk = [_fetch_translation(text, target_language) for text in chunk]
+        results.update(zip(chunk, translated_chunk))
+    return results
+
+
+def _resolve_batch(texts, target_language, batch):
+    try:
+        results = batch.result()
+    except Exception as e:
+        print(f"Translation batch failed: {e}")
+        results = {}
+
+    for text in texts:
+        future = _in_flight.pop((text, target_language), None)
+        if future and not future.done():
+            future.set_result(results.get(text))
+
+
+# Non-blocking translation of every string a screen needs, sent as one batch.
+# Identical in-flight requests are shared, and strings that aren't translated
+# within `timeout` seconds (None waits for the translator) are returned untranslated.
+async def translate_many(texts, target_language, timeout=TRANSLATION_TIMEOUT):
+    results, complete = await translate_many_checked(texts, target_language, timeout)
+    return results
+
+
+# translate_many that also says whether every string was translated (False if
+# any fell back to its source text), for callers that keep the results
+async def translate_many_checked(texts, target_language, timeout=TRANSLATION_TIMEOUT):
+    results = list(texts)
+    if not target_language:
+        return results, True
+
+    pending = {}
+    for index, text in enumerate(texts):
+        if not text:
+            continue
+        translated = lookup_translation(text, target_language)
+        if translated is not None:
+            results[index] = translated
+        else:
+            pending.setdefault(text, []).append(index)
+
+    if not pending:
+        return results, True
+
+    loop = asyncio.get_running_loop()
+    waiters = {}
+    to_translate = []
+    for text in pending:
+        future = _in_flight.get((text, target_language))
+        if future is None:
+            future = loop.create_future()
+            _in_flight[(text, target_language)] = future
+            to_translate.append(text)
+        waiters[text] = future
+
+    if to_translate:
+        batch = loop.run_in_executor(_executor, _translate_batch, to_translate, target_language)
+        batch.add_done_callback(
+            lambda batch: _resolve_batch(to_translate, target_language, batch)
+        )
+
+    await asyncio.wait(waiters.values(), timeout=timeout)
+
+    complete = True
+    for text, future in waiters.items():
+        translated = future.result() if future.done() else None
+        if translated:
+            for index in pending[text]:
+                results[index] = translated
+        else:
+            complete = False
+    return results, complete
+
+
+# Translate one string without blocking the event loop
+async def translate(text, target_language):
+    if not target_language or not text:
+        return text
+    return (await translate_many([text], target_language))[0]
+
+
+# Marks a string for the catalog extractor without translating it (gettext_noop)
+def N_(text):
+    return text
+
+
+# Replace the named fields of a template with {0}, {1}, ... so the translator leaves
+# them alone; returns the masked text and the original field markup by position
+def mask_template(template):
+    masked = []
+    fields = []
+    for literal, field_name, spec, conversion in string.Formatter().parse(template):
+        masked.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field_name is not None:
+            markup = field_name
+            if conversion:
+                markup += f"!{conversion}"
+            if spec:
+                markup += f":{spec}"
+            masked.append(f"{{{len(fields)}}}")
+            fields.append(f"{{{markup}}}")
+    return "".join(masked), fields
+
+
+# Put the named fields back into a translated masked template; None if any got lost
+def unmask_template(translated, fields):
+    if not translated:
+        return None
+    found = {int(index) for index in MASKED_FIELD.findall(translated)}
+    if found != set(range(len(fields))):
+        return None
+    return MASKED_FIELD.sub(lambda match: fields[int(match.group(1))], translated)
+
+
+# Formats template values locally, writing numbers with the language's own digits
+class LocaleFormatter(string.Formatter):
+    def __init__(self, language):
+        super().__init__()
+        self.digits = LOCALE_DIGITS.get(language)
+
+    def format_field(self, value, format_spec):
+        formatted = super().format_field(value, format_spec)
+        if self.digits and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return formatted.translate(self.digits)
+        return formatted
+
+
+def format_template(template, language, values):
+    try:
+        return LocaleFormatter(language).vformat(template, (), values)
+    except (KeyError, IndexError, ValueError):
+        return template
+
+
+# Blocking template translation, used by the catalog build step
+def machine_translate_template(template, target_language):
+    try:
+        masked, fields = mask_template(template)
+    except ValueError:
+        return machine_translate(template, target_language)
+    if not fields:
+        return machine_translate(template, target_language)
+    return unmask_template(machine_translate(masked, target_language), fields) or template
+
+
+# Translate a message template once per language and fill in its values locally,
+# so dynamic messages share one cache entry instead of one per value
+async def translate_template(template, target_language, **values):
+    translated = template
+    if target_language:
+        translated = message_catalog.gettext(template, target_language)
+        if translated is None:
+            masked, fields = mask_template(template)
+            masked_translation = (await translate_many([masked], target_language))[0]
+            translated = unmask_template(masked_translation, fields) or template
+    return format_template(translated, target_language, values)
@@ -0,0 +1,71 @@
+import functools
+
+from database import Session
+from models import User
+from repository import get_user
+from user_profiles import profile_of, user_profile_cache
+
+
+# Run a handler as one unit of work: open a session, look up the profile of the
+# user behind the update and attach both to the context, then commit once when the
+# handler returns or roll back if it raises. Handlers and helpers called from inside
+# an open unit of work (show_main_menu, add_credit_to_user, other handlers) reuse
+# it. The session only connects once a handler actually queries, so screens that
+# need nothing but the cached profile don't touch the database.
+def unit_of_work(callback):
+    @functools.wraps(callback)
+    async def handler(update, context):
+        if getattr(context, "session", None) is not None:
+            return await callback(update, context)
+
+        async with Session() as session:
+            context.session = session
+            context.user_row = None
+            context.profile = None
+            if update.effective_user:
+                context.profile = await load_profile(context, update.effective_user.id)
+            try:
+                result = await callback(update, context)
+                await session.commit()
+                return result
+            except BaseException:
+                await session.rollback()
+                raise
+            finally:
+                context.session = None
+                context.user_row = None
+                context.profile = None
+
+    return handler
+
+
+# Wrap every registered handler so each update gets exactly one unit of work
+def install_unit_of_work(application):
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = unit_of_work(handler.callback)
+
+
+# Profile from the cache; a miss loads the user row once and keeps it for current_user
+async def load_profile(context, num_id):
+    profile = user_profile_cache.get(num_id)
+    if profile is None:
+        user = await get_user(context.session, num_id)
+        if user is not None:
+            profile = user_profile_cache.put(profile_of(user))
+            context.user_row = user
+    return profile
+
+
+# The current user's row, for handlers that read credits or change the user;
+# loaded by primary key on first use, None for users who never ran /start
+async def current_user(context):
+    if context.user_row is None and context.profile is not None:
+        context.user_row = await context.session.get(User, context.profile.id)
+    return context.user_row
+
+
+# The current user's profile if they are an admin, otherwise None
+def current_admin(context):
+    profile = context.profile
+    return profile if profile and profile.is_admin else None
@@ -0,0 +1,97 @@
+import time
+from collections import OrderedDict, namedtuple
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from config import USER_PROFILE_CACHE_SIZE, USER_PROFILE_CACHE_TTL
+from models import User
+
+# The part of a user row that most screens need: who they are, which language
+# to answer in and whether to show the admin menus
+UserProfile = namedtuple("UserProfile", ["id", "num_id", "preferred_language", "is_admin"])
+
+
+def profile_of(user):
+    return UserProfile(user.id, user.num_id, user.preferred_language, bool(user.is_admin))
+
+
+# Bounded LRU of user profiles keyed by Telegram id. Changes the bot commits are
+# written through (see below); entries also expire after `ttl` seconds so edits
+# made outside the bot are picked up.
+class UserProfileCache:
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    # Cached profile for a Telegram id, or None on a miss
+    def get(self, num_id):
+        entry = self._entries.get(num_id)
+        if entry is not None:
+            if time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(num_id)
+                self.hits += 1
+                return entry[1]
+            del self._entries[num_id]
+            self.expired += 1
+        self.misses += 1
+        return None
+
+    def put(self, profile):
+        self._entries[profile.num_id] = (time.monotonic(), profile)
+        self._entries.move_to_end(profile.num_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return profile
+
+    def invalidate(self, num_id):
+        self._entries.pop(num_id, None)
+
+    # Snapshot of the cache counters for logging and monitoring
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+user_profile_cache = UserProfileCache(USER_PROFILE_CACHE_TTL, USER_PROFILE_CACHE_SIZE)
+
+
+# Write-through: note the profiles of the user rows each flush inserts, changes or
+# deletes (a language choice, an admin flag) and apply them to the cache only once
+# the transaction commits, so a rolled back change never reaches it
+@event.listens_for(OrmSession, "after_flush")
+def collect_profile_changes(session, flush_context):
+    changes = session.info.setdefault("profile_changes", {})
+    for user in chain(session.new, session.dirty):
+        if isinstance(user, User):
+            changes[user.num_id] = profile_of(user)
+    for user in session.deleted:
+        if isinstance(user, User):
+            changes[user.num_id] = None
+
+
+@event.listens_for(OrmSession, "after_commit")
+def write_through_profiles(session):
+    for num_id, profile in session.info.pop("profile_changes", {}).items():
+        if profile is None:
+            user_profile_cache.invalidate(num_id)
+        else:
+            user_profile_cache.put(profile)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def discard_profile_changes(session):
+    session.info.pop("profile_changes", None)